@@ -1,22 +1,76 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+# Settings are resolved before numpy and XGBoost load, so that their native
+# thread pools start at the configured size (serving/config.py)
+try:
+    from serving.config import load_settings
+except ImportError:
+    from config import load_settings
+settings = load_settings()
+settings.apply_thread_environment()
+
+from fastapi import FastAPI, HTTPException, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, PlainTextResponse, RedirectResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import Optional, Dict, Any, List
+from enum import Enum
 import sys
 import os
+import asyncio
+import math
+import time
 from datetime import datetime
 import json
+import logging
+import hmac
+import hashlib
+from urllib.parse import urlencode
+import anyio
+import numpy as np
+import pandas as pd
 import uvicorn
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from preprocessing.preprocess import preprocess
-    from predict.predict import predict, load_model
+    from preprocessing.preprocess import load_geo_data, find_geo_path
+    from preprocessing.pipeline import FeaturePipeline, CATEGORY_ENUMS, Province, PropertyType, PropertySubtype, EpcScore
+    from predict.predict import predict, predict_batch, predict_row, load_bundle, find_model_path, set_model_threads
+    from predict.explain import ContributionExplainer
+    from predict.metadata import ModelMetadata
+    from serving.singleflight import SingleFlight
+    from serving.ratelimit import rate_limiter_from_env
+    from serving.admission import admission_from_env
+    from serving.loadshed import load_shedder_from_env
+    from serving.traffic import TrafficCaptureMiddleware, traffic_recorder_from_env
+    from serving.profiling import ProfileSession, ProfileStore, sample_stacks
+    from serving.tracing import TracingMiddleware, tracer_from_env, span, queued
+    from serving.drift import DriftMonitor, load_baseline
+    from serving.audit import audit_log_from_env, audit_record
+    from serving.serialization import dumps, choose_encoding, compress, MIN_COMPRESS_BYTES
+    from market.market_stats import MarketStats
+    from market.comparables import ComparablesIndex
 except ImportError:
-    from preprocess import preprocess
-    from predict import predict, load_model
+    from preprocess import load_geo_data, find_geo_path
+    from pipeline import FeaturePipeline, CATEGORY_ENUMS, Province, PropertyType, PropertySubtype, EpcScore
+    from predict import predict, predict_batch, predict_row, load_bundle, find_model_path, set_model_threads
+    from explain import ContributionExplainer
+    from metadata import ModelMetadata
+    from singleflight import SingleFlight
+    from ratelimit import rate_limiter_from_env
+    from admission import admission_from_env
+    from loadshed import load_shedder_from_env
+    from traffic import TrafficCaptureMiddleware, traffic_recorder_from_env
+    from profiling import ProfileSession, ProfileStore, sample_stacks
+    from tracing import TracingMiddleware, tracer_from_env, span, queued
+    from drift import DriftMonitor, load_baseline
+    from audit import audit_log_from_env, audit_record
+    from serialization import dumps, choose_encoding, compress, MIN_COMPRESS_BYTES
+    from market_stats import MarketStats
+    from comparables import ComparablesIndex
+
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
@@ -25,7 +79,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     docs_from_flash="/docs-interactive",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -37,18 +92,163 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in sampling of prediction traffic for replay (TRAFFIC_CAPTURE_PATH)
+traffic_recorder = traffic_recorder_from_env()
+if traffic_recorder is not None:
+    app.add_middleware(TrafficCaptureMiddleware, recorder=traffic_recorder)
+
+# Per-request span timelines for a sample of requests (TRACE_EXPORT_PATH / TRACE_EXPORT_URL)
+tracer = tracer_from_env()
+if tracer is not None:
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+
 # Load model once at startup
 model = None
 
+# Raw request fields -> feature matrix; replaced by the pipeline bundled with the model, if any
+feature_pipeline = FeaturePipeline()
+
+# Per-feature explanations, with a cache of recently explained feature vectors
+EXPLAIN_CACHE_SIZE = settings.explain_cache_size
+explainer = None
+
+# /model/info body, computed once per loaded model
+model_metadata = None
+
+# Identical requests arriving while a prediction is running share its result
+prediction_flight = SingleFlight()
+
+# Threads running the blocking preprocessing/prediction work, sized from the CPUs by default
+THREADPOOL_SIZE = settings.threadpool_size
+
+# Model and postal code files actually loaded, and the native thread pools found at startup
+loaded_paths = {"model": None, "geo_data": None}
+native_thread_pools = None
+
+# Per-client token buckets (weighted by rows) and global concurrency admission
+rate_limiter = rate_limiter_from_env()
+# Sized from the CPUs left to this worker (cgroup quota included), like the thread pools
+admission = admission_from_env(cpus=settings.cpus_per_worker)
+MAX_BATCH_SIZE = settings.max_batch_size
+
+# Switches to a truncated tree ensemble when the service is overloaded;
+# its queue threshold follows admission.max_concurrency
+load_shedder = load_shedder_from_env()
+
+# Market aggregates from the local listings file, kept up to date in the background
+LISTINGS_PATH = settings.listings_path
+MARKET_REFRESH_SECONDS = settings.market_refresh_seconds
+market_stats = MarketStats(LISTINGS_PATH)
+
+# Nearest historical listings, from an index built offline by market/comparables.py
+COMPARABLES_INDEX_PATH = settings.comparables_index_path
+comparables_index = None
+
+# Live feature distributions vs. the training baseline written by run_model_trainer.py
+DRIFT_BASELINE_PATH = settings.drift_baseline_path
+DRIFT_WINDOW = settings.drift_window
+drift_monitor = None
+
+# How long HTTP caches may reuse a GET /predict response (seconds)
+GET_PREDICT_MAX_AGE = settings.get_predict_max_age
+
+# Write-behind log of every served prediction (AUDIT_DB_PATH)
+audit_log = audit_log_from_env()
+
+# Admin-only profiling (X-Admin-Token header); disabled when ADMIN_TOKEN is not set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+profile_store = ProfileStore(
+    max_entries=settings.profile_store_size,
+    directory=os.getenv("PROFILE_DIR")
+)
+MAX_SAMPLE_SECONDS = 60
+
+async def refresh_market_stats():
+    """Build the market statistics, then pick up appended listings periodically"""
+    try:
+        await run_in_threadpool(market_stats.load)
+        print(f"Market statistics ready: {len(market_stats.price)} listings")
+        while True:
+            await asyncio.sleep(MARKET_REFRESH_SECONDS)
+            new_rows = await run_in_threadpool(market_stats.refresh)
+            if new_rows:
+                print(f"Market statistics updated with {new_rows} new listings")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Warning: market statistics unavailable: {e}")
+
+def set_model(new_model, model_path=None, pipeline=None):
+    """
+    Install a loaded model and rebuild everything derived from it
+    pipeline is the FeaturePipeline bundled with the model; without one the
+    default encodings are used
+    """
+    global model, explainer, model_metadata, feature_pipeline
+    set_model_threads(new_model, settings.xgboost_nthread)
+    load_shedder.configure(new_model, admission.max_concurrency)
+    explainer = ContributionExplainer(new_model, cache_size=EXPLAIN_CACHE_SIZE)
+    model_metadata = ModelMetadata(new_model, model_path, pipeline)
+    feature_pipeline = pipeline or FeaturePipeline()
+    model = new_model
+
 @app.on_event("startup")
 async def startup_event():
     """Load model on startup"""
-    global model
+    global comparables_index, drift_monitor, native_thread_pools
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Pools of libraries that were loaded before the settings were applied
+    native_thread_pools = settings.limit_loaded_thread_pools()
+    
     try:
-        model = load_model()
-        print("Model loaded successfully at startup")
+        model_path = settings.model_path or find_model_path()
+        if model_path and not os.path.exists(model_path):
+            print(f"Warning: model file {model_path} not found")
+            model_path = None
+        loaded_model, pipeline = load_bundle(model_path) if model_path else (None, None)
+        if loaded_model is not None:
+            set_model(loaded_model, model_path, pipeline)
+            loaded_paths["model"] = model_path
+            print("Model loaded successfully at startup")
     except Exception as e:
         print(f"Warning: Could not load model at startup: {e}")
+    
+    # Postal code coordinates, unless the bundled pipeline carries its own
+    if not feature_pipeline.geo:
+        geo_path = settings.geo_data_path or find_geo_path()
+        geo_df = load_geo_data(geo_path)
+        if geo_df is None:
+            print("Warning: postal code coordinates not found, unknown locations use the centre of Belgium")
+        else:
+            loaded_paths["geo_data"] = geo_path
+        feature_pipeline.set_geo(geo_df)
+    if os.path.exists(DRIFT_BASELINE_PATH):
+        try:
+            drift_monitor = DriftMonitor(load_baseline(DRIFT_BASELINE_PATH), feature_pipeline.columns, window=DRIFT_WINDOW)
+            print(f"Drift monitor watching {len(drift_monitor.names)} features")
+        except Exception as e:
+            print(f"Warning: Could not load drift baseline: {e}")
+    if os.path.exists(COMPARABLES_INDEX_PATH):
+        try:
+            comparables_index = ComparablesIndex.load(COMPARABLES_INDEX_PATH)
+            print(f"Comparables index memory-mapped: {len(comparables_index)} listings")
+        except Exception as e:
+            print(f"Warning: Could not load comparables index: {e}")
+    
+    if os.path.exists(LISTINGS_PATH):
+        asyncio.ensure_future(refresh_market_stats())
+    else:
+        print(f"Warning: listings file {LISTINGS_PATH} not found, market statistics disabled")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write out captured traffic that is still queued"""
+    if traffic_recorder is not None:
+        await run_in_threadpool(traffic_recorder.close)
+    if tracer is not None:
+        await run_in_threadpool(tracer.exporter.close)
+    if audit_log is not None:
+        await run_in_threadpool(audit_log.close)
 
 # Pydantic models for request/response validation
 class PredictionRequest(BaseModel):
@@ -58,10 +258,10 @@ class PredictionRequest(BaseModel):
     toiletCount: Optional[int] = Field(None, description="Number of toilets")
     terraceSurface: Optional[int] = Field(None, description="Terrace surface area (m²)")
     gardenSurface: Optional[int] = Field(None, description="Garden surface area (m²)")
-    province: Optional[str] = Field(None, description="Belgian province")
-    type: Optional[str] = Field(None, description="Property type (APARTMENT or HOUSE)")
-    subtype: Optional[str] = Field(None, description="Property subtype")
-    epcScore: Optional[str] = Field(None, description="Energy performance certificate (A+ to G)")
+    province: Optional[Province] = Field(None, description="Belgian province")
+    type: Optional[PropertyType] = Field(None, description="Property type (APARTMENT or HOUSE)")
+    subtype: Optional[PropertySubtype] = Field(None, description="Property subtype")
+    epcScore: Optional[EpcScore] = Field(None, description="Energy performance certificate (A+ to G)")
     postCode: Optional[str] = Field(None, description="Postal code")
     hasAttic: Optional[bool] = Field(None, description="Has attic")
     hasGarden: Optional[bool] = Field(None, description="Has garden")
@@ -80,16 +280,55 @@ class PredictionRequest(BaseModel):
     hasPhotovoltaicPanels: Optional[bool] = Field(None, description="Has solar panels")
     hasLivingRoom: Optional[bool] = Field(None, description="Has living room")
 
+    @field_validator("province", "type", "subtype", "epcScore", mode="before")
+    @classmethod
+    def parse_category(cls, value, info):
+        # Any spelling the model knows (case, spaces, '-' and '_' ignored) becomes
+        # its enum member, which carries the model code; others are a 422
+        return CATEGORY_ENUMS[info.field_name].parse(value)
+
 class PredictionResponse(BaseModel):
     predicted_price: float = Field(..., description="Predicted price in EUR")
     currency: str = Field("EUR", description="Currency of the prediction")
     status: str = Field("success", description="Status of the prediction")
     timestamp: str = Field(..., description="Timestamp of the prediction")
     input_summary: Dict[str, Any] = Field(..., description="Summary of input parameters")
+    inference_mode: str = Field("full", description="'full' model or 'fast' truncated ensemble used under load")
+
+class BatchPredictionRequest(BaseModel):
+    properties: List[PredictionRequest] = Field(..., description="Properties to price in one call")
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[float] = Field(..., description="Predicted prices in EUR, in request order")
+    count: int = Field(..., description="Number of predicted properties")
+    currency: str = Field("EUR", description="Currency of the predictions")
+    status: str = Field("success", description="Status of the prediction")
+    timestamp: str = Field(..., description="Timestamp of the prediction")
+    inference_mode: str = Field("full", description="'full' model or 'fast' truncated ensemble used under load")
+
+class ExplanationResponse(BaseModel):
+    explanations: List[Dict[str, Any]] = Field(..., description="Price, base value and per-feature contributions for each property")
+    count: int = Field(..., description="Number of explained properties")
+    currency: str = Field("EUR", description="Currency of prices and contributions")
+    status: str = Field("success", description="Status of the explanation")
+    timestamp: str = Field(..., description="Timestamp of the explanation")
+
+class ComparablesResponse(BaseModel):
+    comparables: List[Dict[str, Any]] = Field(..., description="Most similar past listings, closest first")
+    count: int = Field(..., description="Number of comparables returned")
+    status: str = Field("success", description="Status of the search")
+    timestamp: str = Field(..., description="Timestamp of the search")
+
+class BatchComparablesResponse(BaseModel):
+    results: List[List[Dict[str, Any]]] = Field(..., description="Comparables for each property, in request order")
+    count: int = Field(..., description="Number of query properties")
+    status: str = Field("success", description="Status of the search")
+    timestamp: str = Field(..., description="Timestamp of the search")
 
 class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
+    model_loaded_at: Optional[str] = None
     timestamp: str
 
 class ServiceInfo(BaseModel):
@@ -115,7 +354,17 @@ async def home():
             "documentation": "/docs",
             "alternative_docs": "/redoc",
             "prediction": "/predict",
-            "model_info": "/model/info"
+            "batch_prediction": "/predict/batch",
+            "explain": "/predict/explain",
+            "model_info": "/model/info",
+            "comparables": "/comparables",
+            "batch_comparables": "/comparables/batch",
+            "market_provinces": "/market/provinces",
+            "market_postcode": "/market/postcodes/{post_code}",
+            "drift": "/monitoring/drift",
+            "stats": "/stats",
+            "config": "/config",
+            "live_prediction": "/ws/predict"
         },
         timestamp=datetime.now().isoformat()
     )
@@ -128,6 +377,7 @@ async def health_check():
     return HealthResponse(
         status="healthy",
         model_loaded=model is not None,
+        model_loaded_at=model_metadata.loaded_at.isoformat() if model_metadata is not None else None,
         timestamp=datetime.now().isoformat()
     )
 
@@ -231,10 +481,45 @@ async def interactive_docs():
                 <p>Main prediction endpoint - accepts JSON with property data</p>
             </div>
             
+            <div class="endpoint">
+                <h3><span class="method post">POST</span> /predict/batch</h3>
+                <p>Batch prediction - accepts <code>{"properties": [...]}</code> and returns one price per property</p>
+            </div>
+            
             <div class="endpoint">
                 <h3><span class="method get">GET</span> /model/info</h3>
                 <p>Information about the loaded ML model</p>
             </div>
+            
+            <div class="endpoint">
+                <h3><span class="method post">POST</span> /predict/explain</h3>
+                <p>Per-feature price contributions for <code>{"properties": [...]}</code>, optionally limited with <code>?top_k=</code></p>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method post">POST</span> /comparables</h3>
+                <p>The <code>k</code> most similar past listings for a property (<code>/comparables/batch</code> for several)</p>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /market/provinces</h3>
+                <p>Market statistics per province (median price, price per m², quantiles, counts)</p>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /market/postcodes/{post_code}</h3>
+                <p>Market statistics for one postal code</p>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method get">WS</span> /ws/predict</h3>
+                <p>Live what-if predictions over a WebSocket - send <code>{"seq": 1, "features": {...}}</code> with the changed fields</p>
+            </div>
+            
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /stats</h3>
+                <p>Runtime counters (request coalescing, rate limiting, admission)</p>
+            </div>
         </div>
     </body>
     </html>
@@ -242,52 +527,355 @@ async def interactive_docs():
     return HTMLResponse(content=docs_html)
 
 @app.get("/model/info")
-async def model_info():
+async def model_info(request: Request):
     """
     Information about the loaded model
+    
+    Computed once when the model is loaded and served with an ETag,
+    so clients can revalidate with If-None-Match. Last-Modified is the
+    time this worker loaded the model.
     """
-    if model is None:
+    if model_metadata is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
+    headers = {"ETag": model_metadata.etag, "Last-Modified": model_metadata.last_modified, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == model_metadata.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=model_metadata.payload, media_type="application/json", headers=headers)
+
+@app.get("/market/provinces")
+async def market_provinces():
+    """
+    Price aggregates per province (median, quantiles, price per m², counts)
+    """
+    if not market_stats.ready:
+        raise HTTPException(status_code=503, detail="Market statistics not available")
+    return Response(content=market_stats.provinces_payload, media_type="application/json")
+
+@app.get("/market/postcodes/{post_code}")
+async def market_postcode(post_code: str):
+    """
+    Price aggregates for one postal code
+    """
+    if not market_stats.ready:
+        raise HTTPException(status_code=503, detail="Market statistics not available")
+    payload = market_stats.postcode_payloads.get(post_code.strip().lstrip("0") or "0")
+    if payload is None:
+        return JSONResponse(status_code=404, content={"detail": f"No listings for postal code {post_code}", "status": "error"})
+    return Response(content=payload, media_type="application/json")
+
+@app.get("/monitoring/drift")
+async def feature_drift(details: bool = Query(False, description="Include the per-bin expected and observed shares")):
+    """
+    Drift of the live feature distributions from the training data
+    
+    Population stability index per encoded feature over the most recent
+    predictions; "drifted" lists the features above 0.25.
+    """
+    if drift_monitor is None:
+        return JSONResponse(status_code=404, content={"detail": f"No drift baseline loaded ({DRIFT_BASELINE_PATH})", "status": "error"})
+    return drift_monitor.scores(details=details)
+
+@app.get("/stats")
+async def stats():
+    """
+    Runtime counters for the prediction path
+    """
+    return {
+        "coalescing": prediction_flight.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "admission": admission.stats(),
+        "threadpool": threadpool_stats(),
+        "load_shedding": load_shedder.stats(),
+        "explain_cache": explainer.stats() if explainer is not None else None,
+        "traffic_capture": traffic_recorder.stats() if traffic_recorder is not None else None,
+        "tracing": tracer.stats() if tracer is not None else None,
+        "audit": audit_log.stats() if audit_log is not None else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/config")
+async def runtime_config():
+    """
+    Resolved runtime settings, where each value came from, and the files and
+    thread pools actually in use
+    """
+    config = settings.as_dict()
+    config["effective"] = {
+        "model_path": loaded_paths["model"],
+        "geo_data_path": loaded_paths["geo_data"],
+        "threadpool": threadpool_stats(),
+        "xgboost_nthread": model.get_params().get("n_jobs") if hasattr(model, "get_params") else None,
+        "native_thread_pools": native_thread_pools,
+    }
+    return config
+
+async def enforce_rate_limit(raw_request, cost):
+    """
+    Reject the request with 429 when the client has no tokens left
+    """
+    client = rate_limiter.identify(raw_request)
+    if rate_limiter.store.blocking:
+        # The shared SQLite store can wait on other workers' locks
+        allowed, retry_after = await run_in_threadpool(rate_limiter.check, client, cost)
+    else:
+        allowed, retry_after = rate_limiter.check(client, cost)
+    if not allowed:
+        if retry_after is None:
+            raise HTTPException(status_code=429, detail="Request exceeds the rate limit burst size. Split it into smaller batches.")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded. Please retry later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def admit(batch=False):
+    """
+    Take a concurrency slot or reject with 503 straight away
+    """
+    if not admission.try_acquire(batch=batch):
+        raise HTTPException(status_code=503, detail="Server busy. Please retry shortly.", headers={"Retry-After": "1"})
+
+def require_admin(raw_request):
+    """
+    Reject the request with 403 unless it carries the admin token
+    """
+    token = raw_request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+def profiling_requested(raw_request, profile):
+    return profile or raw_request.headers.get("x-profile", "").lower() in ("1", "true", "yes")
+
+def threadpool_stats():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {"size": int(limiter.total_tokens), "busy": limiter.borrowed_tokens}
+
+def encode_request(house_data):
+    """
+    Encoded feature row of one validated property; categories arrive as enum
+    members carrying their code, so this is a handful of array writes
+    """
+    with span("preprocess.encode"):
+        row = feature_pipeline.encode_fields(house_data)
+    with span("preprocess.geo"):
+        feature_pipeline.locate(row, house_data)
+    return row
+
+def compute_prediction(row, iteration_range=None):
+    """
+    Run prediction for one encoded feature row (blocking)
+    """
+    if drift_monitor is not None:
+        drift_monitor.observe(row)
+    with span("inference"):
+        return predict_row(row, model, iteration_range)
+
+def compute_batch_prediction(rows, iteration_range=None):
+    """
+    Run preprocessing and prediction for a list of properties (blocking)
+    Returns (prices, encoded feature matrix)
+    """
+    with span("preprocess", rows=len(rows)):
+        preprocessed_data = feature_pipeline.transform(pd.DataFrame(rows))
+    features = preprocessed_data.to_numpy()
+    if drift_monitor is not None:
+        drift_monitor.observe_many(features)
+    with span("inference", rows=len(rows)):
+        return predict_batch(preprocessed_data, model=model, iteration_range=iteration_range), features
+
+def compute_explanations(rows, top_k):
+    """
+    Per-feature contributions for a list of properties (blocking)
+    """
+    preprocessed_data = feature_pipeline.transform(pd.DataFrame(rows))
+    return explainer.explain(preprocessed_data, top_k=top_k)
+
+def compute_comparables(rows, k):
+    """
+    Find the k nearest listings for each property (blocking)
+    """
+    preprocessed_data = feature_pipeline.transform(pd.DataFrame(rows))
+    return comparables_index.query(preprocessed_data, k=k)
+
+def audit_predictions(endpoint, inference_mode, prices, latency_ms, inputs, features):
+    """
+    Hand served predictions to the audit log; 503 when its queue is full and
+    the overflow policy rejects them
+    """
+    if audit_log is None:
+        return
+    latency_ms = round(latency_ms, 3)
+    records = [audit_record(endpoint, model_metadata.version, inference_mode, price, latency_ms, row_inputs, row_features)
+               for price, row_inputs, row_features in zip(prices, inputs, features)]
+    if not audit_log.record(records):
+        raise HTTPException(status_code=503, detail="Audit log is full. Please retry shortly.", headers={"Retry-After": "1"})
+
+def canonical_query(house_data, fast=False, lean=False):
+    """
+    The one query string GET /predict answers for these fields: keys sorted,
+    booleans as true/false, flags only when set
+    """
+    params = {key: ("true" if value else "false") if isinstance(value, bool)
+              else value.value if isinstance(value, Enum) else str(value)
+              for key, value in house_data.items()}
+    if fast:
+        params["fast"] = "true"
+    if lean:
+        params["lean"] = "true"
+    return urlencode(sorted(params.items()))
+
+def prediction_etag(row, inference_mode, lean):
+    """
+    Strong ETag of a GET /predict response: its body only depends on the
+    encoded features, the model version, the inference mode and lean
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{model_metadata.version}|{inference_mode}|{int(lean)}|".encode())
+    digest.update(np.ascontiguousarray(row, dtype=np.float64).tobytes())
+    return f'"{digest.hexdigest()[:32]}"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+async def run_prediction(house_data, fast=False, endpoint="/predict", row=None):
+    """
+    Price one property; returns (predicted_price, inference_mode)
+    The features are encoded on the event loop (pass `row` when already
+    done); the model runs off it, and concurrent calls with the same encoded
+    features wait on a single shared computation
+    Takes an admission slot (503 when full) unless it joins a running
+    computation: a joiner does no model work, so a burst of identical
+    requests is answered by one prediction instead of being rejected
+    """
+    started = time.perf_counter()
+    if row is None:
+        row = encode_request(house_data)
+    # Counts this request as if admitted, like the callers that admitted first
+    inference_mode, iteration_range = load_shedder.choose(admission.in_flight + 1, requested_fast=fast)
+    # Spellings that encode alike share a flight
+    flight_key = inference_mode.encode() + row.tobytes()
+    
+    # No await between this check and run(): the flight cannot finish in between
+    admitted = not prediction_flight.running(flight_key)
+    if admitted:
+        admit()
     try:
-        # Get model information
-        model_info_data = {
-            "model_type": str(type(model).__name__),
-            "status": "loaded",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Try to get additional model information if available
-        if hasattr(model, 'get_params'):
-            model_info_data["parameters"] = model.get_params()
-        
-        if hasattr(model, 'feature_importances_'):
-            # Get top 10 most important features
-            feature_names = [
-                'bedroomCount', 'bathroomCount', 'habitableSurface', 'toiletCount',
-                'terraceSurface', 'gardenSurface', 'province_encoded',
-                'type_encoded', 'subtype_encoded', 'epcScore_encoded', 'lat', 'lon'
-            ]
-            
-            if len(model.feature_importances_) <= len(feature_names):
-                importances = list(zip(feature_names[:len(model.feature_importances_)], 
-                                     model.feature_importances_))
-                importances.sort(key=lambda x: x[1], reverse=True)
-                model_info_data["top_features"] = importances[:10]
-        
-        return model_info_data
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting model info: {str(e)}")
+        with span("prediction", inference_mode=inference_mode):
+            # A coalesced call has no worker spans of its own: they are in the trace that ran it
+            predicted_price = await prediction_flight.run(flight_key, queued(compute_prediction), row, iteration_range)
+    finally:
+        if admitted:
+            admission.release()
+    latency_ms = (time.perf_counter() - started) * 1000
+    load_shedder.observe(latency_ms)
+    
+    if predicted_price is not None:
+        audit_predictions(endpoint, inference_mode, [predicted_price], latency_ms, [house_data], [row])
+    return predicted_price, inference_mode
+
+async def run_profiled_prediction(house_data, fast, lean, raw_request):
+    """
+    Price one property under the profiler and return the serialized response
+    Bypasses request coalescing, so the profile always covers the full work
+    """
+    session = ProfileSession()
+    inference_mode, iteration_range = load_shedder.choose(admission.in_flight, requested_fast=fast)
+    started = time.perf_counter()
+
+    def profiled():
+        preprocessed_data = session.stage("preprocess", feature_pipeline.transform, house_data)
+        price = session.stage("predict", predict, preprocessed_data, model=model, iteration_range=iteration_range)
+        return price, preprocessed_data.to_numpy()[0]
+
+    predicted_price, features = await run_in_threadpool(profiled)
+    if predicted_price is None:
+        raise HTTPException(status_code=500, detail="Failed to make prediction. Please check your input data.")
+    audit_predictions(raw_request.url.path, inference_mode, [predicted_price],
+                      (time.perf_counter() - started) * 1000, [house_data], [features])
+
+    payload = prediction_payload(house_data, predicted_price, inference_mode, lean)
+    body = session.stage("serialization", dumps, payload)
+    wall_ms = round((time.perf_counter() - started) * 1000, 3)
+    profile_id = profile_store.add(session, path=raw_request.url.path, inference_mode=inference_mode, wall_ms=wall_ms)
+    return Response(content=body, media_type="application/json", headers={"X-Profile-Id": profile_id})
+
+def prediction_payload(house_data, predicted_price, inference_mode, lean=False):
+    """
+    /predict response body; built as a plain dict, it goes straight to orjson
+    without a second pass through pydantic
+    """
+    if lean:
+        return {"predicted_price": round(predicted_price, 2), "model_version": model_metadata.version}
+    return {
+        "predicted_price": round(predicted_price, 2),
+        "currency": "EUR",
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "input_summary": {
+            "bedrooms": house_data.get("bedroomCount", "default"),
+            "bathrooms": house_data.get("bathroomCount", "default"),
+            "surface": house_data.get("habitableSurface", "default"),
+            "province": house_data.get("province", "default"),
+            "type": house_data.get("type", "default")
+        },
+        "inference_mode": inference_mode
+    }
+
+def batch_prediction_payload(predictions, inference_mode, lean=False):
+    """
+    /predict/batch response body
+    """
+    # Rounding the whole array at once is ~10x faster than round() per price
+    prices = np.round(np.asarray(predictions, dtype=np.float64), 2).tolist()
+    if lean:
+        return {"predictions": prices, "model_version": model_metadata.version}
+    return {
+        "predictions": prices,
+        "count": len(prices),
+        "currency": "EUR",
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "inference_mode": inference_mode
+    }
+
+async def batch_response(content, raw_request):
+    """
+    Serialize a batch response, compressed with gzip or zstd when the client
+    accepts it; large bodies are compressed off the event loop
+    """
+    body = dumps(content)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(raw_request.headers.get("accept-encoding")) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = compress(body, encoding) if len(body) < 65536 else await run_in_threadpool(compress, body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/predict", response_model=PredictionResponse)
-async def predict_price(request: PredictionRequest):
+async def predict_price(
+    request: PredictionRequest,
+    raw_request: Request,
+    fast: bool = Query(False, description="Use the faster, slightly less accurate truncated model"),
+    profile: bool = Query(False, description="Admin only: profile this request (see /admin/profiles)"),
+    lean: bool = Query(False, description="Only return the price and the model version")
+):
     """
     Main prediction endpoint
     
     Accepts property data and returns predicted price in EUR.
     All parameters are optional - missing values will be filled with defaults.
+    Under overload (or with ?fast=true) only the first boosting rounds are evaluated.
+    With ?profile=true or an X-Profile header (admin token required) the request
+    runs under the profiler; the X-Profile-Id response header names the stored profile.
+    With ?lean=true the body is just {"predicted_price", "model_version"}.
     """
+    await enforce_rate_limit(raw_request, cost=1)
     try:
         # Check if model is loaded
         if model is None:
@@ -296,39 +884,376 @@ async def predict_price(request: PredictionRequest):
         # Convert Pydantic model to dict
         house_data = request.dict(exclude_none=True)
         
-        # Log the incoming request (optional, for debugging)
-        print(f"Prediction request received: {json.dumps(house_data, indent=2)}")
+        # Formatted only when debug logging is on: this runs for every prediction
+        logger.debug("Prediction request received: %s", house_data)
         
-        # Preprocess the data
-        preprocessed_data = preprocess(house_data)
+        if profiling_requested(raw_request, profile):
+            require_admin(raw_request)
+            admit()
+            try:
+                return await run_profiled_prediction(house_data, fast, lean, raw_request)
+            finally:
+                admission.release()
         
-        # Make prediction
-        predicted_price = predict(preprocessed_data)
+        # Admission is decided in run_prediction, once it knows whether the request can be coalesced
+        predicted_price, inference_mode = await run_prediction(house_data, fast)
         
         if predicted_price is None:
             raise HTTPException(status_code=500, detail="Failed to make prediction. Please check your input data.")
         
-        # Create response
-        response = PredictionResponse(
-            predicted_price=round(predicted_price, 2),
-            currency="EUR",
+        return ORJSONResponse(prediction_payload(house_data, predicted_price, inference_mode, lean))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/predict")
+async def predict_price_cacheable(
+    raw_request: Request,
+    fast: bool = Query(False, description="Use the faster, slightly less accurate truncated model"),
+    lean: bool = Query(False, description="Only return the price and the model version")
+):
+    """
+    Cacheable prediction endpoint
+    
+    Takes the /predict fields as query parameters, e.g.
+    /predict?habitableSurface=120&postCode=1000&province=Brussels.
+    Requests that are not in canonical form (keys sorted, unknown parameters
+    dropped) are redirected to it with 308, so caches see one URL per property.
+    Responses carry a strong ETag and Cache-Control; If-None-Match answers 304
+    without running the model. The body leaves out the timestamp and the echoed
+    inputs, so it only depends on what the ETag covers.
+    """
+    params = {key: value for key, value in raw_request.query_params.items() if key in PredictionRequest.model_fields}
+    try:
+        house_data = PredictionRequest(**params).dict(exclude_none=True)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    
+    cache_control = f"public, max-age={GET_PREDICT_MAX_AGE}"
+    canonical = canonical_query(house_data, fast, lean)
+    if raw_request.url.query != canonical:
+        location = raw_request.url.path + (f"?{canonical}" if canonical else "")
+        return RedirectResponse(location, status_code=308, headers={"Cache-Control": cache_control})
+    
+    await enforce_rate_limit(raw_request, cost=1)
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded. Please check server logs.")
+    
+    row = encode_request(house_data)
+    etag = prediction_etag(row, "fast" if fast else "full", lean)
+    if etag_matches(raw_request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    
+    try:
+        predicted_price, inference_mode = await run_prediction(house_data, fast, endpoint="GET /predict", row=row)
+        if predicted_price is None:
+            raise HTTPException(status_code=500, detail="Failed to make prediction. Please check your input data.")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    if inference_mode != ("fast" if fast else "full"):
+        # Degraded by load shedding: answer, but keep it out of every cache
+        cache_control = "no-store"
+    payload = {"predicted_price": round(predicted_price, 2), "model_version": model_metadata.version}
+    if not lean:
+        payload.update({"currency": "EUR", "inference_mode": inference_mode})
+    return ORJSONResponse(payload, headers={"ETag": prediction_etag(row, inference_mode, lean), "Cache-Control": cache_control})
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch_prices(
+    request: BatchPredictionRequest,
+    raw_request: Request,
+    fast: bool = Query(False, description="Use the faster, slightly less accurate truncated model"),
+    lean: bool = Query(False, description="Only return the prices and the model version")
+):
+    """
+    Batch prediction endpoint
+    
+    Accepts a list of properties and returns their predicted prices in the same order.
+    Rate limits are charged per property, not per request.
+    With ?lean=true the body is just {"predictions", "model_version"}; responses
+    are gzip or zstd compressed when the Accept-Encoding header allows it.
+    """
+    rows = [item.dict(exclude_none=True) for item in request.properties]
+    if not rows:
+        raise HTTPException(status_code=422, detail="At least one property is required.")
+    if len(rows) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(rows)} properties (max {MAX_BATCH_SIZE}).")
+    
+    await enforce_rate_limit(raw_request, cost=len(rows))
+    admit(batch=True)
+    try:
+        if model is None:
+            raise HTTPException(status_code=500, detail="Model not loaded. Please check server logs.")
+        
+        inference_mode, iteration_range = load_shedder.choose(admission.in_flight, requested_fast=fast)
+        started = time.perf_counter()
+        with span("prediction", inference_mode=inference_mode, rows=len(rows)):
+            predictions, features = await run_in_threadpool(queued(compute_batch_prediction), rows, iteration_range)
+        
+        if predictions is None:
+            raise HTTPException(status_code=500, detail="Failed to make batch prediction. Please check your input data.")
+        audit_predictions("/predict/batch", inference_mode, predictions, (time.perf_counter() - started) * 1000, rows, features)
+        
+        return await batch_response(batch_prediction_payload(predictions, inference_mode, lean), raw_request)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        admission.release(batch=True)
+
+@app.post("/predict/explain", response_model=ExplanationResponse)
+async def explain_prices(
+    request: BatchPredictionRequest,
+    raw_request: Request,
+    top_k: Optional[int] = Query(None, ge=1, le=28, description="Only list the k largest contributions, the rest is summed into 'other'")
+):
+    """
+    Per-feature price explanations
+    
+    Returns, for each property, how much every feature moved the price away from
+    the model's base value. Contributions add up to the predicted price.
+    """
+    rows = [item.dict(exclude_none=True) for item in request.properties]
+    if not rows:
+        raise HTTPException(status_code=422, detail="At least one property is required.")
+    if len(rows) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(rows)} properties (max {MAX_BATCH_SIZE}).")
+    
+    await enforce_rate_limit(raw_request, cost=len(rows))
+    admit(batch=len(rows) > 1)
+    try:
+        if explainer is None:
+            raise HTTPException(status_code=500, detail="Model not loaded. Please check server logs.")
+        
+        explanations = await run_in_threadpool(compute_explanations, rows, top_k)
+        return await batch_response({
+            "explanations": explanations,
+            "count": len(explanations),
+            "currency": "EUR",
+            "status": "success",
+            "timestamp": datetime.now().isoformat()
+        }, raw_request)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        admission.release(batch=len(rows) > 1)
+
+@app.post("/comparables", response_model=ComparablesResponse)
+async def comparables(
+    request: PredictionRequest,
+    raw_request: Request,
+    k: int = Query(5, ge=1, le=50, description="Number of comparable listings")
+):
+    """
+    Most similar past listings for one property
+    """
+    await enforce_rate_limit(raw_request, cost=1)
+    admit()
+    try:
+        if comparables_index is None:
+            raise HTTPException(status_code=503, detail="Comparables index not loaded. Please check server logs.")
+        
+        results = await run_in_threadpool(compute_comparables, [request.dict(exclude_none=True)], k)
+        return ComparablesResponse(
+            comparables=results[0],
+            count=len(results[0]),
             status="success",
-            timestamp=datetime.now().isoformat(),
-            input_summary={
-                "bedrooms": house_data.get("bedroomCount", "default"),
-                "bathrooms": house_data.get("bathroomCount", "default"),
-                "surface": house_data.get("habitableSurface", "default"),
-                "province": house_data.get("province", "default"),
-                "type": house_data.get("type", "default")
-            }
+            timestamp=datetime.now().isoformat()
         )
         
-        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        admission.release()
+
+@app.post("/comparables/batch", response_model=BatchComparablesResponse)
+async def comparables_batch(
+    request: BatchPredictionRequest,
+    raw_request: Request,
+    k: int = Query(5, ge=1, le=50, description="Number of comparable listings per property")
+):
+    """
+    Most similar past listings for several properties in one call
+    """
+    rows = [item.dict(exclude_none=True) for item in request.properties]
+    if not rows:
+        raise HTTPException(status_code=422, detail="At least one property is required.")
+    if len(rows) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(rows)} properties (max {MAX_BATCH_SIZE}).")
+    
+    await enforce_rate_limit(raw_request, cost=len(rows))
+    admit(batch=True)
+    try:
+        if comparables_index is None:
+            raise HTTPException(status_code=503, detail="Comparables index not loaded. Please check server logs.")
+        
+        results = await run_in_threadpool(compute_comparables, rows, k)
+        return await batch_response({
+            "results": results,
+            "count": len(results),
+            "status": "success",
+            "timestamp": datetime.now().isoformat()
+        }, raw_request)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        admission.release(batch=True)
+
+async def live_prediction(websocket, seq, features):
+    """
+    Price the current feature state of a live session; returns the reply message
+    """
+    started = time.perf_counter()
+    try:
+        house_data = PredictionRequest(**features).dict(exclude_none=True)
+    except ValidationError as e:
+        return {"seq": seq, "error": str(e)}
+    
+    if model is None:
+        return {"seq": seq, "error": "Model not loaded"}
+    
+    try:
+        await enforce_rate_limit(websocket, cost=1)
+        predicted_price, inference_mode = await run_prediction(house_data, endpoint="/ws/predict")
+    except HTTPException as e:
+        return {"seq": seq, "error": e.detail}
+    except Exception as e:
+        return {"seq": seq, "error": f"Internal server error: {str(e)}"}
+    
+    if predicted_price is None:
+        return {"seq": seq, "error": "Failed to make prediction"}
+    
+    return {
+        "seq": seq,
+        "price": round(predicted_price, 2),
+        "mode": inference_mode,
+        "ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+@app.websocket("/ws/predict")
+async def predict_stream(websocket: WebSocket):
+    """
+    Live what-if channel, one connection per client session
+    
+    The client sends {"seq": n, "features": {...}} with only the fields that
+    changed ("reset": true starts from an empty state). The server keeps the
+    merged features and answers {"seq": n, "price": ..., "mode": ..., "ms": ...}.
+    Updates arriving while a prediction runs are merged, and only the latest
+    state is priced.
+    """
+    await websocket.accept()
+    features = {}
+    latest = {"seq": None}
+    updated = asyncio.Event()
+    
+    async def receive_updates():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await websocket.send_text('{"error":"Invalid JSON"}')
+                continue
+            # Valid JSON of the wrong shape gets an error frame too, instead of ending this task
+            if not isinstance(message, dict):
+                await websocket.send_text('{"error":"Expected a JSON object"}')
+                continue
+            changes = message.get("features") or {}
+            if not isinstance(changes, dict):
+                await websocket.send_text(dumps({"seq": message.get("seq"), "error": "features must be a JSON object"}).decode())
+                continue
+            if message.get("reset"):
+                features.clear()
+            features.update(changes)
+            latest["seq"] = message.get("seq")
+            updated.set()
+    
+    receiver = asyncio.ensure_future(receive_updates())
+    try:
+        while True:
+            waiter = asyncio.ensure_future(updated.wait())
+            await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                waiter.cancel()
+                break
+            
+            updated.clear()
+            reply = await live_prediction(websocket, latest["seq"], dict(features))
+            await websocket.send_text(dumps(reply).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        if receiver.done() and not receiver.cancelled():
+            # Consume the disconnect so it is not reported as unhandled
+            receiver.exception()
+
+@app.get("/audit/predictions", include_in_schema=False)
+async def audit_predictions_query(
+    raw_request: Request,
+    limit: int = Query(50, ge=1, le=1000, description="Records returned, newest first"),
+    since: Optional[float] = Query(None, description="Only records created at or after this Unix time"),
+    model_version: Optional[str] = Query(None, description="Only records priced by this model version"),
+    endpoint: Optional[str] = Query(None, description="Only records served by this endpoint, e.g. /predict/batch")
+):
+    """
+    Recently logged predictions with their inputs and features (admin only)
+    Records still waiting in the write queue are not included
+    """
+    require_admin(raw_request)
+    if audit_log is None:
+        return JSONResponse(status_code=404, content={"detail": "Audit log disabled (AUDIT_DB_PATH)", "status": "error"})
+    records = await run_in_threadpool(audit_log.recent, limit, since, model_version, endpoint)
+    return {"count": len(records), "records": records}
+
+@app.get("/admin/profiles", include_in_schema=False)
+async def list_profiles(raw_request: Request):
+    """
+    Recently profiled requests, newest first (admin only)
+    """
+    require_admin(raw_request)
+    return {"profiles": profile_store.list()}
+
+@app.get("/admin/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(profile_id: str, raw_request: Request):
+    """
+    Stage timings and hottest functions of one profiled request (admin only)
+    """
+    require_admin(raw_request)
+    report = profile_store.get(profile_id)
+    if report is None:
+        return JSONResponse(status_code=404, content={"detail": f"No profile {profile_id}", "status": "error"})
+    return report
+
+@app.get("/admin/profile/sample", include_in_schema=False)
+async def sample_profile(
+    raw_request: Request,
+    seconds: float = Query(5.0, gt=0, le=MAX_SAMPLE_SECONDS, description="How long to sample"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Time between samples"),
+    format: str = Query("json", pattern="^(json|collapsed)$", description="collapsed: one 'stack count' line per stack, for flame graphs")
+):
+    """
+    Sample the stacks of all worker threads for a few seconds (admin only)
+    """
+    require_admin(raw_request)
+    result = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000)
+    if format == "collapsed":
+        return PlainTextResponse("".join(f"{stack} {count}\n" for stack, count in result["stacks"].items()))
+    return result
 
 # Custom exception handler
 @app.exception_handler(404)
@@ -338,7 +1263,7 @@ async def not_found_handler(request: Request, exc):
         content={
             "error": "Endpoint not found",
             "status": "error",
-            "available_endpoints": ["/", "/health", "/docs", "/redoc", "/predict", "/model/info"]
+            "available_endpoints": ["/", "/health", "/docs", "/redoc", "/predict", "/predict/batch", "/predict/explain", "/model/info", "/comparables", "/comparables/batch", "/market/provinces", "/market/postcodes/{post_code}", "/monitoring/drift", "/stats", "/config", "/ws/predict"]
         }
     )
 
@@ -353,4 +1278,8 @@ if __name__ == '__main__':
     print("Prediction endpoint: http://localhost:8000/predict")
     print("=" * 55)
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    if settings.workers > 1:
+        # Worker processes import the app themselves
+        uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=settings.workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Accuracy vs latency of the truncated-ensemble fast mode
+
+Evaluates the model with only the first K boosting rounds for several K and
+reports, per K, the single-row and batch latency and how far the prices move
+from the full model (and from the real prices when a listings CSV is given).
+
+    python benchmarks/fast_mode.py --model model/Immo_ML.pkl --rounds 25 50 100 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing.preprocess import load_geo_data
+from preprocessing.pipeline import FeaturePipeline
+from predict.predict import prepare_features, predict_with_model, unpack_artifact
+
+PROVINCES = ["Brussels", "Antwerp", "East Flanders", "West Flanders", "Flemish Brabant",
+             "Walloon Brabant", "Hainaut", "Liège", "Luxembourg", "Namur", "Limburg"]
+EPC_SCORES = ["A+", "A", "B", "C", "D", "E", "F", "G"]
+
+
+def synthetic_properties(base_house, n_rows, seed=0):
+    """
+    Variations of base_house.json with random surfaces, types and locations
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n_rows):
+        house = dict(base_house)
+        house["type"] = str(rng.choice(["APARTMENT", "HOUSE"]))
+        house["subtype"] = house["type"]
+        house["province"] = str(rng.choice(PROVINCES))
+        house["postCode"] = str(rng.integers(1000, 9999))
+        house["habitableSurface"] = int(rng.integers(30, 400))
+        house["bedroomCount"] = int(rng.integers(0, 6))
+        house["epcScore"] = str(rng.choice(EPC_SCORES))
+        rows.append(house)
+    return pd.DataFrame(rows)
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings))
+
+
+def run(model, features, rounds, repeat, target=None):
+    total_rounds = model.get_booster().num_boosted_rounds()
+    single_row = features.iloc[:1]
+    full_prices = predict_with_model(model, features)
+
+    results = []
+    for k in sorted(set(min(k, total_rounds) for k in rounds) | {total_rounds}):
+        iteration_range = None if k == total_rounds else (0, k)
+        prices = predict_with_model(model, features, iteration_range)
+        deviation = np.abs(prices - full_prices) / np.maximum(np.abs(full_prices), 1.0)
+
+        result = {
+            "rounds": k,
+            "single_row_ms": time_call(lambda: predict_with_model(model, single_row, iteration_range), repeat),
+            "batch_ms": time_call(lambda: predict_with_model(model, features, iteration_range), max(1, repeat // 10)),
+            "batch_rows": len(features),
+            "mean_pct_vs_full": float(deviation.mean() * 100),
+            "p95_pct_vs_full": float(np.percentile(deviation, 95) * 100),
+        }
+        if target is not None:
+            result["mape_vs_actual"] = float((np.abs(prices - target) / np.maximum(target, 1.0)).mean() * 100)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fast mode (truncated boosting rounds)")
+    parser.add_argument("--model", default="model/Immo_ML.pkl")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 25, 50, 100, 200])
+    parser.add_argument("--rows", type=int, default=2000, help="Synthetic rows when no --listings is given")
+    parser.add_argument("--listings", help="CSV of listings with a 'price' column, used instead of synthetic rows")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    model, pipeline = unpack_artifact(joblib.load(args.model))
+    if pipeline is None:
+        pipeline = FeaturePipeline.with_geo(load_geo_data())
+
+    target = None
+    if args.listings:
+        listings = pd.read_csv(args.listings)
+        target = listings.pop("price").to_numpy(dtype=float)
+    else:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        with open(os.path.join(base_dir, "base_house.json")) as f:
+            listings = synthetic_properties(json.load(f), args.rows)
+
+    features = prepare_features(pipeline.transform(listings))
+    results = run(model, features, args.rounds, args.repeat, target)
+
+    print(f"{'rounds':>7} {'1 row ms':>9} {'batch ms':>9} {'mean %':>8} {'p95 %':>8}" + (f" {'MAPE %':>8}" if target is not None else ""))
+    for r in results:
+        line = f"{r['rounds']:>7} {r['single_row_ms']:>9.3f} {r['batch_ms']:>9.2f} {r['mean_pct_vs_full']:>8.2f} {r['p95_pct_vs_full']:>8.2f}"
+        if target is not None:
+            line += f" {r['mape_vs_actual']:>8.2f}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Load generator and scaling report for the prediction API
+
+Closed-loop asyncio load: `concurrency` clients each send a request, wait
+for the answer and send the next one, for --duration seconds per level.
+Payloads are variations of base_house.json (random postcodes, types,
+subtypes, provinces and surfaces); with a batch size above 1 they go to
+/predict/batch.
+
+Targets:
+- asgi (default): the app in this process, driven through ASGI directly;
+  uses model/Immo_ML.pkl, or a synthetic stand-in with --synthetic-model
+- server: uvicorn started by this tool, once per --workers value
+- --url: an already running server
+
+For every combination of workers, thread pool size (THREADPOOL_SIZE) and
+batch size, the report gives throughput and p50/p95/p99 latency per
+concurrency level, and the saturation point: the level after which adding
+clients raises throughput by less than --saturation-gain.
+
+    python benchmarks/load_test.py --synthetic-model --concurrency 1 4 16 64
+    python benchmarks/load_test.py --target server --workers 1 2 4 --threadpool 8 40 --batch-sizes 1 50
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+# Same relaxed protections as the stage benchmark (set before the app is imported)
+from benchmarks.prediction_path import asgi_post, synthetic_geo_table, synthetic_model
+
+PROVINCES = ["Brussels", "Antwerp", "East Flanders", "West Flanders", "Flemish Brabant",
+             "Walloon Brabant", "Hainaut", "Liège", "Luxembourg", "Namur", "Limburg"]
+SUBTYPES = {
+    "APARTMENT": ["APARTMENT", "FLAT_STUDIO", "DUPLEX", "PENTHOUSE", "GROUND_FLOOR", "LOFT"],
+    "HOUSE": ["HOUSE", "VILLA", "TOWN_HOUSE", "MANSION", "BUNGALOW", "FARMHOUSE"],
+}
+EPC_SCORES = ["A+", "A", "B", "C", "D", "E", "F", "G"]
+
+# Environment for servers started by this tool, so that rate limiting,
+# admission and fast mode do not cap the measurement
+SERVER_ENV = {
+    "RATE_LIMIT_PER_MINUTE": "1000000000",
+    "RATE_LIMIT_BURST": "1000000000",
+    "ADMISSION_MAX_CONCURRENCY": "1024",
+    "FAST_MODE_LATENCY_MS": "1000000000",
+}
+
+
+def house_variations(base_house, n, seed=0):
+    rng = np.random.default_rng(seed)
+    houses = []
+    for _ in range(n):
+        house = dict(base_house)
+        house["type"] = str(rng.choice(list(SUBTYPES)))
+        house["subtype"] = str(rng.choice(SUBTYPES[house["type"]]))
+        house["province"] = str(rng.choice(PROVINCES))
+        house["postCode"] = str(int(rng.integers(100, 1000)) * 10)
+        house["habitableSurface"] = int(rng.integers(25, 450))
+        house["bedroomCount"] = int(rng.integers(0, 7))
+        house["epcScore"] = str(rng.choice(EPC_SCORES))
+        houses.append(house)
+    return houses
+
+
+def request_payloads(base_house, batch_size, n=2000, seed=0):
+    """
+    (path, payload) pairs cycled through by the clients
+    """
+    houses = house_variations(base_house, n * batch_size if batch_size > 1 else n, seed)
+    if batch_size == 1:
+        return [("/predict", house) for house in houses]
+    return [("/predict/batch", {"properties": houses[i:i + batch_size]}) for i in range(0, len(houses), batch_size)]
+
+
+class HTTPConnection:
+    """
+    Minimal keep-alive HTTP/1.1 client for JSON POSTs and GETs (one request at a time)
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def post(self, path, payload, return_body=False):
+        """
+        payload is JSON-serialized unless it is already bytes; returns the
+        status code, or (status, body bytes) with return_body
+        """
+        return await self.request("POST", path, payload, return_body)
+
+    async def get(self, path, return_body=False):
+        return await self.request("GET", path, None, return_body)
+
+    async def request(self, method, path, payload, return_body=False):
+        """
+        One request; a None payload sends no body (GET)
+        """
+        if payload is None:
+            head, body = "", b""
+        else:
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            head = f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        for attempt in range(2):
+            try:
+                if self.writer is None:
+                    self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+                self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n{head}\r\n".encode() + body)
+                await self.writer.drain()
+                status, response_body = await self._read_response()
+                return (status, response_body) if return_body else status
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server closed an idle keep-alive connection: reconnect once
+                self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self):
+        status = int((await self.reader.readline()).split()[1])
+        length, close = 0, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        response_body = await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status, response_body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def run_level(make_sender, payloads, concurrency, duration, rows_per_request):
+    """
+    Closed-loop load at one concurrency level
+    """
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+    counter = iter(range(10 ** 12))
+
+    async def client(client_send):
+        while time.perf_counter() < deadline:
+            path, payload = payloads[next(counter) % len(payloads)]
+            started = time.perf_counter()
+            try:
+                status = await client_send(path, payload)
+            except Exception:
+                status = "error"
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(make_sender()) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ok = statuses.get(200, 0)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "requests_per_second": ok / elapsed,
+        "rows_per_second": ok * rows_per_request / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if latencies else None,
+        "p95_ms": float(np.percentile(latencies, 95)) if latencies else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if latencies else None,
+    }
+
+
+def saturation_point(levels, min_gain):
+    """
+    Concurrency after which throughput grows by less than min_gain (a fraction), or None
+    """
+    for current, following in zip(levels, levels[1:]):
+        if current["requests_per_second"] <= 0:
+            continue
+        if following["requests_per_second"] / current["requests_per_second"] - 1 < min_gain:
+            return current["concurrency"]
+    return None
+
+
+async def sweep(make_sender, payloads, args, rows_per_request):
+    levels = []
+    for concurrency in args.concurrency:
+        if args.warmup:
+            await run_level(make_sender, payloads, min(concurrency, 4), args.warmup, rows_per_request)
+        level = await run_level(make_sender, payloads, concurrency, args.duration, rows_per_request)
+        levels.append(level)
+        print(f"  c={concurrency:<4} {level['requests_per_second']:>9.1f} req/s  p50 {level['p50_ms']:>8.1f}  "
+              f"p95 {level['p95_ms']:>8.1f}  p99 {level['p99_ms']:>8.1f} ms  errors {level['errors']}", file=sys.stderr)
+    return levels
+
+
+def asgi_sender_factory(api):
+    def make_sender():
+        return lambda path, payload: asgi_post(api.app, path, payload)
+    return make_sender
+
+
+def http_sender_factory(host, port):
+    def make_sender():
+        connection = HTTPConnection(host, port)
+        return connection.post
+    return make_sender
+
+
+async def run_asgi(api, threadpool, payloads, args, rows_per_request):
+    import anyio
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = threadpool or 40
+    return await sweep(asgi_sender_factory(api), payloads, args, rows_per_request)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def uvicorn_server(workers, threadpool, startup_timeout=120):
+    """
+    Start `uvicorn app:app` with the given workers; yields (host, port)
+    """
+    port = free_port()
+    # WEB_CONCURRENCY lets each worker size its threads for its share of the CPUs
+    env = {**os.environ, **SERVER_ENV, "THREADPOOL_SIZE": str(threadpool or 0), "WEB_CONCURRENCY": str(workers)}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + startup_timeout
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=2) as response:
+                    if json.load(response).get("model_loaded"):
+                        break
+            except (urllib.error.URLError, ConnectionError, OSError, ValueError):
+                pass
+            if process.poll() is not None or time.time() > deadline:
+                raise RuntimeError(f"uvicorn did not become healthy (workers={workers})")
+            time.sleep(0.5)
+        yield "127.0.0.1", port
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_report(runs):
+    for run in runs:
+        config = run["config"]
+        print(f"\nworkers={config['workers']} threadpool={config['threadpool'] or 'default'} "
+              f"batch_size={config['batch_size']}")
+        print(f"{'conc':>6} {'req/s':>9} {'rows/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}  throughput")
+        peak = max(level["requests_per_second"] for level in run["levels"]) or 1.0
+        for level in run["levels"]:
+            bar = "#" * int(round(30 * level["requests_per_second"] / peak))
+            marker = "  <- saturation" if level["concurrency"] == run["saturation_concurrency"] else ""
+            print(f"{level['concurrency']:>6} {level['requests_per_second']:>9.1f} {level['rows_per_second']:>10.1f} "
+                  f"{level['p50_ms']:>9.1f} {level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f} {level['errors']:>7}  {bar}{marker}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the prediction API and report how it scales")
+    parser.add_argument("--target", choices=["asgi", "server"], default="asgi")
+    parser.add_argument("--url", help="Load an already running server instead (e.g. http://127.0.0.1:8000)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="uvicorn workers (server target)")
+    parser.add_argument("--threadpool", type=int, nargs="+", default=[0], help="THREADPOOL_SIZE values, 0 = derived from the CPUs")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of warm-up before each level")
+    parser.add_argument("--saturation-gain", type=float, default=0.05)
+    parser.add_argument("--synthetic-model", action="store_true", help="asgi target: use a stand-in model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    with open(os.path.join(BASE_DIR, "base_house.json")) as f:
+        base_house = json.load(f)
+    target = "url" if args.url else args.target
+
+    api = None
+    if target == "asgi":
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            import app as api
+            if args.synthetic_model:
+                api.set_model(synthetic_model(), None, api.FeaturePipeline.with_geo(synthetic_geo_table()))
+            else:
+                asyncio.run(api.startup_event())
+        if api.model is None:
+            sys.exit("No model loaded; pass --synthetic-model or put the model in model/Immo_ML.pkl")
+
+    runs = []
+    workers_values = args.workers if target == "server" else [None]
+    threadpool_values = args.threadpool if target != "url" else [None]
+    for workers in workers_values:
+        for threadpool in threadpool_values:
+            for batch_size in args.batch_sizes:
+                payloads = request_payloads(base_house, batch_size, seed=args.seed)
+                config = {"target": target, "workers": workers, "threadpool": threadpool, "batch_size": batch_size}
+                print(f"Running {config}", file=sys.stderr)
+                if target == "asgi":
+                    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                        levels = asyncio.run(run_asgi(api, threadpool, payloads, args, batch_size))
+                elif target == "server":
+                    with uvicorn_server(workers, threadpool) as (host, port):
+                        levels = asyncio.run(sweep(http_sender_factory(host, port), payloads, args, batch_size))
+                else:
+                    url = urlparse(args.url)
+                    levels = asyncio.run(sweep(http_sender_factory(url.hostname, url.port or 80), payloads, args, batch_size))
+                runs.append({
+                    "config": config,
+                    "levels": levels,
+                    "peak_requests_per_second": max(level["requests_per_second"] for level in levels),
+                    "saturation_concurrency": saturation_point(levels, args.saturation_gain),
+                })
+
+    print_report(runs)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created_at": datetime.now().isoformat(), "cpu_count": os.cpu_count(),
+                       "duration_s": args.duration, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
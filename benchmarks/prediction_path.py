@@ -0,0 +1,324 @@
+"""
+Latency, allocations and throughput of every stage of the prediction path
+
+Runs without the real model or postal code file: a small XGBoost model is
+trained on synthetic data and a postal code table is generated, then both
+are installed in the API. Measured, at single-row and batch sizes:
+
+- stages: encode (FeaturePipeline), geo_lookup, prepare_features,
+  model_predict, predict() and the blocking part of the handler
+- allocations: peak and retained traced memory per request
+- http: end-to-end requests per second through the ASGI app (no network),
+  for /predict at several concurrencies and for /predict/batch
+
+Results can be saved as a JSON baseline and compared with an earlier one:
+
+    python benchmarks/prediction_path.py --output benchmarks/baselines/main.json
+    python benchmarks/prediction_path.py --baseline benchmarks/baselines/main.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+# Keep the protections out of the measurement: no client is rate limited,
+# admission allows the highest concurrency the benchmark uses, and fast
+# mode never kicks in
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "1000000000")
+os.environ.setdefault("RATE_LIMIT_BURST", "1000000000")
+os.environ.setdefault("ADMISSION_MAX_CONCURRENCY", "256")
+os.environ.setdefault("FAST_MODE_LATENCY_MS", "1000000000")
+
+import xgboost as xgb
+
+from preprocessing.pipeline import FeaturePipeline, FEATURE_COLUMNS
+from predict.predict import predict, predict_batch, prepare_features, predict_with_model
+
+PROVINCES = ["Brussels", "Antwerp", "East Flanders", "West Flanders", "Flemish Brabant",
+             "Walloon Brabant", "Hainaut", "Liège", "Luxembourg", "Namur", "Limburg"]
+
+# Lower is better for latencies and memory, higher for throughput
+HIGHER_IS_BETTER = {"requests_per_second"}
+
+
+def synthetic_geo_table(seed=0):
+    rng = np.random.default_rng(seed)
+    codes = np.arange(1000, 10000, 10)
+    return pd.DataFrame({
+        "postCode": codes.astype(str),
+        "lat": 49.5 + rng.random(len(codes)) * 2,
+        "lon": 2.5 + rng.random(len(codes)) * 3.9,
+    })
+
+
+def synthetic_model(n_estimators=200, max_depth=6, seed=0):
+    """
+    Stand-in for Immo_ML.pkl: same features and tree shapes, random data
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = 5000
+    features = pd.DataFrame(rng.random((n_rows, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS)
+    features["habitableSurface"] *= 400
+    features["province_encoded"] = rng.integers(1, 12, n_rows)
+    prices = 2500 * features["habitableSurface"] + 20000 * features["province_encoded"] + rng.normal(0, 1e4, n_rows)
+    model = xgb.XGBRegressor(n_estimators=n_estimators, max_depth=max_depth, tree_method="hist", n_jobs=1)
+    return model.fit(features, prices)
+
+
+def synthetic_requests(base_house, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_rows):
+        house = dict(base_house)
+        house["habitableSurface"] = int(rng.integers(30, 400))
+        house["bedroomCount"] = int(rng.integers(0, 6))
+        house["province"] = PROVINCES[i % len(PROVINCES)]
+        house["postCode"] = str(int(rng.integers(100, 1000)) * 10)
+        rows.append(house)
+    return rows
+
+
+def latency(func, repeat, warmup=3):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "mean_ms": float(np.mean(timings)),
+        "iterations": repeat,
+    }
+
+
+def allocations(func, repeat):
+    """
+    Peak traced memory of one call, and memory still held after `repeat` calls, per call
+    """
+    func()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(repeat):
+        func()
+    retained = (tracemalloc.get_traced_memory()[0] - before) / repeat
+    tracemalloc.stop()
+    return {"peak_kb": peak / 1024, "retained_kb": retained / 1024, "iterations": repeat}
+
+
+async def asgi_post(app, path, payload, return_body=False):
+    """
+    One POST through the ASGI app, without a server or HTTP client
+    payload is JSON-serialized unless it is already bytes; returns the status
+    code, or (status, body bytes) with return_body
+    """
+    return await asgi_request(app, "POST", path, payload, return_body)
+
+
+async def asgi_get(app, path, return_body=False):
+    return await asgi_request(app, "GET", path, None, return_body)
+
+
+async def asgi_request(app, method, path, payload, return_body=False):
+    """
+    One request through the ASGI app; a None payload sends no body (GET)
+    """
+    headers = [(b"host", b"benchmark")]
+    if payload is None:
+        body = b""
+    else:
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("benchmark", 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status = None
+    response_body = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if return_body:
+                response_body.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return (status, b"".join(response_body)) if return_body else status
+
+
+async def http_throughput(app, path, payloads, concurrency):
+    """
+    Send every payload, `concurrency` at a time; requests per second and latency percentiles
+    """
+    queue = list(payloads)
+    timings, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        while queue:
+            payload = queue.pop()
+            started = time.perf_counter()
+            status = await asgi_post(app, path, payload)
+            timings.append((time.perf_counter() - started) * 1000)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_second": len(timings) / elapsed,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "errors": errors,
+        "requests": len(timings),
+    }
+
+
+def run(base_house, batch_sizes, repeat, http_requests, concurrencies):
+    import app as api
+
+    geo = synthetic_geo_table()
+    pipeline = FeaturePipeline.with_geo(geo)
+    model = synthetic_model()
+    api.set_model(model, None, pipeline)
+
+    results = {}
+    rows = synthetic_requests(base_house, max(batch_sizes))
+    for size in batch_sizes:
+        data = rows[0] if size == 1 else pd.DataFrame(rows[:size])
+        postcodes = {"postCode": data["postCode"]} if size == 1 else data[["postCode"]]
+        encoded = pipeline.transform(data)
+        prepared = prepare_features(encoded)
+        stage_repeat = max(5, repeat // size) if size > 1 else repeat
+
+        stages = {
+            "encode": lambda: pipeline.transform(data),
+            "geo_lookup": lambda: pipeline.transform(postcodes),
+            "prepare_features": lambda: prepare_features(encoded),
+            "model_predict": lambda: predict_with_model(model, prepared),
+            "predict": (lambda: predict(encoded, model=model)) if size == 1 else (lambda: predict_batch(encoded, model=model)),
+            "handler": (lambda: api.compute_prediction(api.encode_request(data))) if size == 1 else (lambda: api.compute_batch_prediction(rows[:size])),
+        }
+        for stage, func in stages.items():
+            result = latency(func, stage_repeat)
+            result["rows_per_second"] = size * 1000 / result["p50_ms"]
+            results[f"latency/{stage}/{size}"] = result
+        results[f"allocations/handler/{size}"] = allocations(stages["handler"], min(stage_repeat, 50))
+
+    single = synthetic_requests(base_house, http_requests, seed=1)
+    for concurrency in concurrencies:
+        results[f"http/predict/c{concurrency}"] = asyncio.run(http_throughput(api.app, "/predict", single, concurrency))
+    batch_size = max(batch_sizes)
+    batches = [{"properties": rows[:batch_size]} for _ in range(max(5, http_requests // batch_size))]
+    result = asyncio.run(http_throughput(api.app, "/predict/batch", batches, 1))
+    result["rows_per_second"] = result["requests_per_second"] * batch_size
+    results[f"http/predict_batch/{batch_size}"] = result
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every shared metric; returns the regressions beyond threshold (a fraction)
+    """
+    regressions = []
+    print(f"\n{'metric':<44} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        # p95 and rows/s are left out: the first is too noisy, the second follows p50
+        for metric in ("p50_ms", "peak_kb", "requests_per_second"):
+            if metric not in current or metric not in previous or not previous[metric]:
+                continue
+            change = current[metric] / previous[metric] - 1
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = " !" if worse > threshold else ""
+            if worse > threshold:
+                regressions.append(f"{name} {metric}")
+            print(f"{name + ' ' + metric:<44} {previous[metric]:>12.3f} {current[metric]:>12.3f} {change * 100:>7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the prediction path")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per single-row stage (fewer for batches)")
+    parser.add_argument("--http-requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--output", help="Save the results as a JSON baseline")
+    parser.add_argument("--baseline", help="Compare with a baseline saved by an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    args = parser.parse_args()
+
+    with open(os.path.join(BASE_DIR, "base_house.json")) as f:
+        base_house = json.load(f)
+
+    # The prediction path prints diagnostics; keep them out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(base_house, sorted(set(args.batch_sizes)), args.repeat, args.http_requests, args.concurrency)
+
+    print(f"{'metric':<36} {'p50 ms':>9} {'p95 ms':>9} {'rows/s':>12} {'req/s':>9} {'peak KB':>9}")
+    for name, r in results.items():
+        cells = [f"{r[key]:>{width}.{digits}f}" if key in r else f"{'-':>{width}}"
+                 for key, width, digits in (("p50_ms", 9, 3), ("p95_ms", 9, 3), ("rows_per_second", 12, 0),
+                                            ("requests_per_second", 9, 1), ("peak_kb", 9, 1))]
+        print(f"{name:<36} " + " ".join(cells))
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "xgboost": xgb.__version__,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: " + ", ".join(regressions))
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Throughput and peak memory of preprocess() on large inputs
+
+Encodes synthetic property frames of increasing size, either as one frame
+(preprocess) or chunk by chunk from a generator (preprocess_chunks), and
+reports rows per second and the peak memory allocated while encoding (the
+input frame itself is not counted in frame mode; in chunk mode the input is
+generated lazily, so it is counted, one chunk at a time).
+
+    python benchmarks/preprocess_scale.py --rows 10000 1000000 10000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing.preprocess import preprocess, preprocess_chunks, get_pipeline, DEFAULT_CHUNK_SIZE
+
+PROVINCES = ["Brussels", "Antwerp", "East Flanders", "West Flanders", "Flemish Brabant",
+             "Walloon Brabant", "Hainaut", "Liège", "Luxembourg", "Namur", "Limburg"]
+SUBTYPES = ["APARTMENT", "HOUSE", "FLAT_STUDIO", "DUPLEX", "PENTHOUSE", "VILLA", "town_house"]
+EPC_SCORES = ["A+", "A", "B", "C", "D", "E", "F", "G"]
+
+
+def synthetic_frame(base_house, n_rows, seed=0):
+    """
+    n_rows variations of base_house.json, generated column by column
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for field, value in base_house.items():
+        if isinstance(value, bool):
+            columns[field] = rng.random(n_rows) < 0.3
+        elif isinstance(value, (int, float)):
+            columns[field] = np.full(n_rows, value, dtype=np.float64)
+    columns["habitableSurface"] = rng.integers(30, 400, n_rows).astype(np.float64)
+    columns["bedroomCount"] = rng.integers(0, 6, n_rows).astype(np.float64)
+    # Labels drawn from small object arrays share their string objects, like a parsed CSV column
+    columns["province"] = np.array(PROVINCES, dtype=object)[rng.integers(0, len(PROVINCES), n_rows)]
+    columns["subtype"] = np.array(SUBTYPES, dtype=object)[rng.integers(0, len(SUBTYPES), n_rows)]
+    columns["type"] = np.where(np.isin(columns["subtype"], ["HOUSE", "VILLA", "town_house"]), "HOUSE", "APARTMENT").astype(object)
+    columns["epcScore"] = np.array(EPC_SCORES, dtype=object)[rng.integers(0, len(EPC_SCORES), n_rows)]
+    postcodes = np.array([str(code) for code in range(1000, 10000, 10)], dtype=object)
+    columns["postCode"] = postcodes[rng.integers(0, len(postcodes), n_rows)]
+    return pd.DataFrame(columns)
+
+
+def synthetic_chunks(base_house, n_rows, chunk_size):
+    for seed, start in enumerate(range(0, n_rows, chunk_size)):
+        yield synthetic_frame(base_house, min(chunk_size, n_rows - start), seed=seed)
+
+
+def measure(func, trace_memory):
+    """
+    (seconds, peak MB allocated during func); the timing run is untraced
+    """
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+    peak_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return seconds, peak_mb
+
+
+def run_frame(base_house, n_rows, dtype, trace_memory):
+    df = synthetic_frame(base_house, n_rows)
+    input_mb = df.memory_usage(deep=False).sum() / 1e6
+    seconds, peak_mb = measure(lambda: preprocess(df, dtype=dtype), trace_memory)
+    return {"input_mb": round(input_mb, 1), "seconds": seconds, "peak_mb": peak_mb}
+
+
+def run_chunks(base_house, n_rows, chunk_size, dtype, trace_memory):
+    def consume():
+        # Reduce every chunk so that nothing but the running total is kept
+        total = 0.0
+        for features in preprocess_chunks(synthetic_chunks(base_house, n_rows, chunk_size), dtype=dtype):
+            total += float(features["habitableSurface"].sum())
+        return total
+
+    # Input generation is part of the loop, time it alone to subtract it
+    generation = time.perf_counter()
+    for _ in synthetic_chunks(base_house, n_rows, chunk_size):
+        pass
+    generation = time.perf_counter() - generation
+
+    seconds, peak_mb = measure(consume, trace_memory)
+    return {"seconds": max(seconds - generation, 1e-9), "generation_seconds": generation, "peak_mb": peak_mb}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preprocess() throughput and memory on large frames")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000, 10000000])
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32")
+    parser.add_argument("--max-frame-rows", type=int, default=2000000,
+                        help="Larger inputs are only run in chunk mode (one frame would not fit in memory)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that measures peak memory")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(base_dir, "base_house.json")) as f:
+        base_house = json.load(f)
+    dtype = np.dtype(args.dtype)
+    trace_memory = not args.no_memory
+    get_pipeline()  # load the postal code table before timing
+
+    results = []
+    for n_rows in args.rows:
+        modes = [("chunks", lambda: run_chunks(base_house, n_rows, args.chunk_size, dtype, trace_memory))]
+        if n_rows <= args.max_frame_rows:
+            modes.insert(0, ("frame", lambda: run_frame(base_house, n_rows, dtype, trace_memory)))
+        for mode, bench in modes:
+            result = {"rows": n_rows, "mode": mode, "dtype": args.dtype, **bench()}
+            result["rows_per_second"] = n_rows / result["seconds"]
+            results.append(result)
+
+    print(f"{'rows':>10} {'mode':>7} {'seconds':>9} {'rows/s':>12} {'peak MB':>9}")
+    for r in results:
+        peak = f"{r['peak_mb']:>9.1f}" if r["peak_mb"] is not None else f"{'-':>9}"
+        print(f"{r['rows']:>10} {r['mode']:>7} {r['seconds']:>9.2f} {r['rows_per_second']:>12,.0f} {peak}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Replay captured traffic against a build and compare it with an earlier one
+
+Reads a capture written by the API with TRAFFIC_CAPTURE_PATH set (see
+serving/traffic.py) and sends the same requests, byte for byte, with the
+original timing (open loop: requests start on schedule whether or not the
+previous ones have finished). --rate-scale 2 replays twice as fast, --rate
+sends at a fixed number of requests per second instead. Captured GET
+/predict requests are replayed as GETs, so the cacheable path is compared too.
+
+The report compares the latency distribution with the one recorded at
+capture time, and flags every request whose predicted prices differ from the
+captured response. Save a run with --output and pass it as --baseline later
+to compare two builds directly.
+
+    python benchmarks/replay.py capture.jsonl.gz --url http://127.0.0.1:8000 --output before.json
+    python benchmarks/replay.py capture.jsonl.gz --url http://127.0.0.1:8000 --baseline before.json --fail-on-diff
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from benchmarks.prediction_path import asgi_request
+from benchmarks.load_test import HTTPConnection, SERVER_ENV
+from serving.traffic import read_capture
+
+
+def response_prices(body):
+    """
+    Predicted prices in a /predict or /predict/batch response body, or None
+    """
+    try:
+        data = json.loads(body)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    if data.get("predicted_price") is not None:
+        return [data["predicted_price"]]
+    if data.get("predictions") is not None:
+        return list(data["predictions"])
+    return None
+
+
+def schedule(records, rate_scale, rate):
+    """
+    Start offset in seconds of every record
+    """
+    if rate:
+        return [i / rate for i in range(len(records))]
+    first = records[0]["t"]
+    return [(record["t"] - first) / rate_scale for record in records]
+
+
+async def replay(records, offsets, send, max_in_flight):
+    """
+    Send every record at its offset; returns one (status, ms, prices, lag_ms) per record
+    """
+    results = [None] * len(records)
+    slots = asyncio.Semaphore(max_in_flight)
+    started = time.perf_counter()
+
+    async def one(index, record, lag_ms):
+        path = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        request_started = time.perf_counter()
+        try:
+            body = record["body"].encode() if record["method"] == "POST" else None
+            status, body = await send(record["method"], path, body)
+            prices = response_prices(body) if status == 200 else None
+        except Exception:
+            status, prices = "error", None
+        results[index] = (status, (time.perf_counter() - request_started) * 1000, prices, lag_ms)
+        slots.release()
+
+    tasks = []
+    for index, (record, offset) in enumerate(zip(records, offsets)):
+        delay = started + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await slots.acquire()
+        # How late the request starts, e.g. because max_in_flight was reached
+        lag_ms = max(0.0, (time.perf_counter() - started - offset) * 1000)
+        tasks.append(asyncio.ensure_future(one(index, record, lag_ms)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+def percentiles(values):
+    if not values:
+        return None
+    return {f"p{q}": float(np.percentile(values, q)) for q in (50, 90, 95, 99)} | {"mean": float(np.mean(values))}
+
+
+def price_differences(records, before, after, tolerance):
+    """
+    Indices whose prices differ by more than `tolerance` (relative) or whose count differs
+    """
+    flagged = []
+    for index, (old, new) in enumerate(zip(before, after)):
+        if old is None or new is None:
+            continue
+        if len(old) != len(new):
+            flagged.append({"index": index, "before": old, "after": new})
+            continue
+        worst = max((abs(a - b) / max(abs(a), 1.0) for a, b in zip(old, new)), default=0.0)
+        if worst > tolerance:
+            flagged.append({"index": index, "path": records[index]["path"], "max_relative_diff": worst,
+                            "before": old[:5], "after": new[:5], "body": records[index]["body"][:200]})
+    return flagged
+
+
+def print_latency_table(columns):
+    names = [name for name, values in columns if values]
+    print(f"\n{'latency ms':<10} " + " ".join(f"{name:>14}" for name in names))
+    for key in ("p50", "p90", "p95", "p99", "mean"):
+        print(f"{key:<10} " + " ".join(f"{values[key]:>14.2f}" for _, values in columns if values))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured /predict traffic and compare builds")
+    parser.add_argument("capture", help="File written by the API with TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("--url", help="Target server (default: the app in this process, through ASGI)")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="Replay speed relative to the capture")
+    parser.add_argument("--rate", type=float, help="Fixed requests per second instead of the captured timing")
+    parser.add_argument("--limit", type=int, help="Only replay the first N records")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="Relative price difference that is flagged")
+    parser.add_argument("--baseline", help="Output of an earlier replay to compare with")
+    parser.add_argument("--output", help="Save this replay (latencies and prices per request) as JSON")
+    parser.add_argument("--fail-on-diff", action="store_true", help="Exit with status 1 when prices differ")
+    args = parser.parse_args()
+
+    records = list(itertools.islice(read_capture(args.capture), args.limit))
+    if not records:
+        sys.exit(f"No records in {args.capture}")
+    records.sort(key=lambda record: record["t"])
+    offsets = schedule(records, args.rate_scale, args.rate)
+
+    if args.url:
+        url = urlparse(args.url)
+        connections = asyncio.Queue()
+
+        async def send(method, path, body):
+            # Reuse idle keep-alive connections, open new ones as concurrency grows
+            connection = connections.get_nowait() if not connections.empty() else HTTPConnection(url.hostname, url.port or 80)
+            try:
+                return await connection.request(method, path, body, return_body=True)
+            finally:
+                connections.put_nowait(connection)
+    else:
+        for name, value in SERVER_ENV.items():
+            os.environ.setdefault(name, value)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            import app as api
+            asyncio.run(api.startup_event())
+        if api.model is None:
+            sys.exit("No model loaded; put the model in model/Immo_ML.pkl or use --url")
+
+        async def send(method, path, body):
+            return await asgi_request(api.app, method, path, body, return_body=True)
+
+    print(f"Replaying {len(records)} requests over {offsets[-1]:.1f}s", file=sys.stderr)
+    results, elapsed = asyncio.run(replay(records, offsets, send, args.max_in_flight))
+
+    statuses = {}
+    for status, _, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    latencies = [ms for status, ms, _, _ in results if status == 200]
+    summary = {
+        "requests": len(results),
+        "elapsed_s": elapsed,
+        "requests_per_second": len(results) / elapsed if elapsed else None,
+        "statuses": statuses,
+        "latency_ms": percentiles(latencies),
+        "captured_latency_ms": percentiles([record["ms"] for record in records if record.get("status") == 200]),
+        "late_starts": sum(1 for *_, lag in results if lag > 10),
+    }
+    captured_prices = [response_prices(record["response"]) if record.get("status") == 200 else None for record in records]
+    replay_prices = [prices for _, _, prices, _ in results]
+    flagged = {"capture": price_differences(records, captured_prices, replay_prices, args.tolerance)}
+
+    columns = [("captured", summary["captured_latency_ms"]), ("replay", summary["latency_ms"])]
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        columns.insert(1, ("baseline", baseline["summary"]["latency_ms"]))
+        baseline_prices = [entry[2] for entry in baseline["results"]]
+        flagged["baseline"] = price_differences(records, baseline_prices, replay_prices, args.tolerance)
+
+    print(f"{summary['requests']} requests in {elapsed:.1f}s ({summary['requests_per_second']:.1f} req/s), "
+          f"statuses {statuses}, {summary['late_starts']} started >10 ms late")
+    print_latency_table(columns)
+    for against, differences in flagged.items():
+        print(f"\nPrice differences vs {against}: {len(differences)}")
+        for difference in differences[:10]:
+            print(f"  #{difference['index']}: {difference['before']} -> {difference['after']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created_at": datetime.now().isoformat(), "capture": os.path.abspath(args.capture),
+                       "target": args.url or "asgi", "summary": summary, "flagged": flagged,
+                       "results": [[status, round(ms, 3), prices] for status, ms, prices, _ in results]}, f)
+
+    if args.fail_on_diff and any(flagged.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Cost of building and encoding prediction responses, per response mode
+
+For /predict and for /predict/batch at several sizes, times turning a result
+into response bytes:
+
+- pydantic: response model + jsonable_encoder + json.dumps (FastAPI's
+  default path, used before the orjson responses)
+- orjson: the full response body as the API now sends it
+- lean: ?lean=true, price(s) and model version only
+- gzip / zstd: the batch bodies compressed as for Accept-Encoding (zstd
+  only when the zstandard package is installed)
+
+Also reports the size of every body, and end-to-end /predict requests per
+second through the ASGI app in full and lean mode (synthetic model, as in
+prediction_path.py).
+
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --batch-sizes 100 1000 10000 --output serialization.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from benchmarks.prediction_path import (synthetic_geo_table, synthetic_model, synthetic_requests,
+                                        latency, http_throughput)
+from preprocessing.pipeline import FeaturePipeline
+from serving.serialization import dumps, compress, supported_encodings
+
+
+def response_modes(api, house, prices, inference_mode="full"):
+    """
+    {mode: function returning the response bytes}; single prediction when len(prices) == 1
+    """
+    from fastapi.encoders import jsonable_encoder
+
+    if len(prices) == 1:
+        price = prices[0]
+        full = api.prediction_payload(house, price, inference_mode)
+        return {
+            "pydantic": lambda: json.dumps(jsonable_encoder(api.PredictionResponse(**full))).encode(),
+            "orjson": lambda: dumps(api.prediction_payload(house, price, inference_mode)),
+            "lean": lambda: dumps(api.prediction_payload(house, price, inference_mode, lean=True)),
+        }
+
+    def full_batch():
+        return api.batch_prediction_payload(prices, inference_mode)
+
+    def lean_batch():
+        return api.batch_prediction_payload(prices, inference_mode, lean=True)
+
+    modes = {
+        # round() per price, as the batch endpoint did before
+        "pydantic": lambda: json.dumps(jsonable_encoder(api.BatchPredictionResponse(
+            predictions=[round(price, 2) for price in prices], count=len(prices), currency="EUR", status="success",
+            timestamp=datetime.now().isoformat(), inference_mode=inference_mode))).encode(),
+        "orjson": lambda: dumps(full_batch()),
+        "lean": lambda: dumps(lean_batch()),
+    }
+    for encoding in supported_encodings():
+        modes[f"orjson+{encoding}"] = lambda encoding=encoding: compress(dumps(full_batch()), encoding)
+        modes[f"lean+{encoding}"] = lambda encoding=encoding: compress(dumps(lean_batch()), encoding)
+    return modes
+
+
+def run(base_house, batch_sizes, repeat, http_requests):
+    import app as api
+
+    model = synthetic_model()
+    api.set_model(model, None, FeaturePipeline.with_geo(synthetic_geo_table()))
+    rng = np.random.default_rng(0)
+
+    results = {}
+    for size in batch_sizes:
+        prices = [float(price) for price in rng.uniform(1e5, 1e6, size)]
+        name = "predict" if size == 1 else f"predict_batch/{size}"
+        for mode, func in response_modes(api, base_house, prices).items():
+            result = latency(func, max(20, repeat // size))
+            result["bytes"] = len(func())
+            results[f"{name}/{mode}"] = result
+
+    payloads = synthetic_requests(base_house, http_requests, seed=1)
+    for mode, path in (("full", "/predict"), ("lean", "/predict?lean=true")):
+        results[f"http/predict/{mode}"] = asyncio.run(http_throughput(api.app, path, payloads, 1))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response serialization per mode")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=2000, help="Encodings per single response (fewer for batches)")
+    parser.add_argument("--http-requests", type=int, default=300)
+    parser.add_argument("--output", help="Save the results as JSON")
+    args = parser.parse_args()
+
+    with open(os.path.join(BASE_DIR, "base_house.json")) as f:
+        base_house = json.load(f)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(base_house, sorted(set(args.batch_sizes)), args.repeat, args.http_requests)
+
+    print(f"{'response':<32} {'p50 µs':>10} {'p95 µs':>10} {'bytes':>10} {'req/s':>9}")
+    for name, r in results.items():
+        cells = [f"{r['p50_ms'] * 1000:>10.1f}", f"{r['p95_ms'] * 1000:>10.1f}",
+                 f"{r['bytes']:>10}" if "bytes" in r else f"{'-':>10}",
+                 f"{r['requests_per_second']:>9.1f}" if "requests_per_second" in r else f"{'-':>9}"]
+        print(f"{name:<32} " + " ".join(cells))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created_at": datetime.now().isoformat(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
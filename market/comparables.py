@@ -0,0 +1,151 @@
+"""
+Comparable-properties search over historical listings
+
+The index is a KD-tree built offline over the same 28 encoded features that
+predict() uses, standardized so that every feature weighs the same, with
+lat/lon weighted up so that nearby listings rank first. It is saved with
+joblib and memory-mapped when the API starts.
+
+    python market/comparables.py --listings data/listings.csv --output model/comparables.joblib
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing.preprocess import load_geo_data
+from preprocessing.pipeline import FeaturePipeline
+from predict.predict import EXPECTED_COLUMNS, prepare_features, load_bundle
+
+INDEX_VERSION = 1
+DEFAULT_LATLON_WEIGHT = 3.0
+
+# Listing columns returned with each comparable, when present in the listings file
+LISTING_FIELDS = ["id", "price", "habitableSurface", "bedroomCount", "bathroomCount",
+                  "province", "postCode", "type", "subtype", "epcScore"]
+
+class ComparablesIndex:
+    """
+    K nearest historical listings for one or many properties
+    """
+
+    def __init__(self, tree, mean, scale, listings, built_at=None):
+        self.tree = tree
+        self.mean = mean
+        self.scale = scale
+        self.listings = listings
+        self.built_at = built_at
+
+    @classmethod
+    def build(cls, listings_df, latlon_weight=DEFAULT_LATLON_WEIGHT, chunk_size=100000, leaf_size=40, pipeline=None):
+        """
+        Encode the listings with the serving FeaturePipeline and build the tree
+        """
+        if pipeline is None:
+            pipeline = FeaturePipeline.with_geo(load_geo_data())
+        chunks = []
+        for start in range(0, len(listings_df), chunk_size):
+            chunk = listings_df.iloc[start:start + chunk_size]
+            chunks.append(prepare_features(pipeline.transform(chunk)).to_numpy(dtype=np.float64))
+        features = np.vstack(chunks)
+
+        mean = features.mean(axis=0)
+        std = features.std(axis=0)
+        std[std == 0] = 1.0
+        weights = np.ones(len(EXPECTED_COLUMNS))
+        weights[EXPECTED_COLUMNS.index("lat")] = latlon_weight
+        weights[EXPECTED_COLUMNS.index("lon")] = latlon_weight
+        scale = weights / std
+
+        tree = KDTree((features - mean) * scale, leaf_size=leaf_size)
+
+        # Fixed-width columns (no object arrays) so they can be memory-mapped
+        listings = {}
+        for field in LISTING_FIELDS:
+            if field not in listings_df.columns:
+                continue
+            column = listings_df[field]
+            if pd.api.types.is_numeric_dtype(column):
+                listings[field] = column.to_numpy(dtype=np.float64)
+            else:
+                listings[field] = column.fillna("").astype(str).to_numpy(dtype=str)
+
+        return cls(tree, mean, scale, listings, built_at=datetime.now().isoformat())
+
+    def save(self, path):
+        joblib.dump({
+            "version": INDEX_VERSION,
+            "tree": self.tree,
+            "mean": self.mean,
+            "scale": self.scale,
+            "listings": self.listings,
+            "built_at": self.built_at,
+        }, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a saved index; with mmap the arrays stay on disk and are paged in on demand
+        """
+        state = joblib.load(path, mmap_mode="r" if mmap else None)
+        if state.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported comparables index version: {state.get('version')}")
+        return cls(state["tree"], state["mean"], state["scale"], state["listings"], state["built_at"])
+
+    def __len__(self):
+        return self.tree.data.shape[0]
+
+    def query(self, preprocessed_data, k=5):
+        """
+        Return, for every row, its k nearest listings (closest first)
+        """
+        features = prepare_features(preprocessed_data).to_numpy(dtype=np.float64)
+        k = min(k, len(self))
+        distances, indices = self.tree.query((features - self.mean) * self.scale, k=k)
+
+        results = []
+        for row_distances, row_indices in zip(distances, indices):
+            comparables = []
+            for distance, index in zip(row_distances, row_indices):
+                listing = {field: self._value(values[index]) for field, values in self.listings.items()}
+                listing["distance"] = round(float(distance), 4)
+                comparables.append(listing)
+            results.append(comparables)
+        return results
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, np.floating):
+            value = float(value)
+            return int(value) if value.is_integer() else value
+        return str(value)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the comparable-properties index")
+    parser.add_argument("--listings", default="data/listings.csv", help="Listings CSV (request fields + price)")
+    parser.add_argument("--output", default="model/comparables.joblib")
+    parser.add_argument("--latlon-weight", type=float, default=DEFAULT_LATLON_WEIGHT)
+    parser.add_argument("--leaf-size", type=int, default=40)
+    parser.add_argument("--model", default="model/Immo_ML.pkl", help="Use the feature pipeline bundled with this model, if any")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    listings = pd.read_csv(args.listings, dtype={"postCode": str})
+    listings = listings[pd.to_numeric(listings["price"], errors="coerce") > 0].reset_index(drop=True)
+    print(f"Building index over {len(listings)} listings")
+
+    _, pipeline = load_bundle(args.model)
+    index = ComparablesIndex.build(listings, latlon_weight=args.latlon_weight, leaf_size=args.leaf_size, pipeline=pipeline)
+    index.save(args.output)
+    print(f"Saved {args.output} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import io
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+
+class MarketStats:
+    """
+    Per-province and per-postcode price aggregates over a local listings CSV
+    
+    Listings are kept as compact numpy columns, cached in a .npz file next to
+    the CSV so a restart does not re-parse it. Rows appended to the CSV are
+    read incrementally from the last byte offset, and only the provinces and
+    postcodes they touch are recomputed. Responses are pre-serialized JSON.
+    """
+
+    def __init__(self, listings_path, cache_path=None):
+        self.listings_path = listings_path
+        self.cache_path = cache_path or f"{listings_path}.stats.npz"
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.price = np.empty(0, dtype=np.float32)
+        self.price_per_m2 = np.empty(0, dtype=np.float32)
+        self.province_code = np.empty(0, dtype=np.int16)
+        self.postcode = np.empty(0, dtype=np.int32)
+        self.province_names = []
+        self.header = None
+        self.offset = 0
+        self.provinces = {}
+        self.postcodes = {}
+        self.overall = None
+        self.provinces_payload = None
+        self.postcode_payloads = {}
+        self.updated_at = None
+
+    @property
+    def ready(self):
+        return self.provinces_payload is not None
+
+    def load(self):
+        """
+        Restore the columnar cache when it matches the CSV, then read new rows
+        """
+        with self._lock:
+            if not self._load_cache():
+                self._reset()
+            return self._refresh()
+
+    def refresh(self):
+        """
+        Read rows appended since the last call; returns the number of new listings
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        size = os.path.getsize(self.listings_path)
+        if size < self.offset:
+            # File was rewritten rather than appended to, start over
+            print("Listings file shrank, rebuilding market statistics")
+            self._reset()
+        if size == self.offset and self.ready:
+            return 0
+
+        new_rows = self._read_from(self.offset)
+        affected = self._append(new_rows)
+        self._recompute(*affected)
+        self._save_cache()
+        return len(new_rows)
+
+    def _read_from(self, offset):
+        with open(self.listings_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+
+        # Only consume complete lines, a writer may be halfway through one
+        end = data.rfind(b"\n") + 1
+        data = data[:end]
+        self.offset = offset + end
+        if not data.strip():
+            return pd.DataFrame(columns=["price", "habitableSurface", "province", "postCode"])
+
+        if self.header is None:
+            df = pd.read_csv(io.BytesIO(data))
+            self.header = list(df.columns)
+        else:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=self.header)
+        return df
+
+    def _append(self, df):
+        price = pd.to_numeric(df["price"], errors="coerce").to_numpy(dtype=np.float64)
+        if "habitableSurface" in df.columns:
+            surface = pd.to_numeric(df["habitableSurface"], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            surface = np.full(len(df), np.nan)
+        postcode = pd.to_numeric(df["postCode"], errors="coerce").to_numpy(dtype=np.float64)
+
+        provinces = df["province"].astype(str).to_numpy()
+        codes = np.empty(len(df), dtype=np.int16)
+        lookup = {name: code for code, name in enumerate(self.province_names)}
+        for i, name in enumerate(provinces):
+            if name not in lookup:
+                lookup[name] = len(self.province_names)
+                self.province_names.append(name)
+            codes[i] = lookup[name]
+
+        valid = (price > 0) & ~np.isnan(postcode)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_per_m2 = np.where(surface > 0, price / surface, np.nan)
+
+        self.price = np.concatenate([self.price, price[valid].astype(np.float32)])
+        self.price_per_m2 = np.concatenate([self.price_per_m2, price_per_m2[valid].astype(np.float32)])
+        self.province_code = np.concatenate([self.province_code, codes[valid]])
+        self.postcode = np.concatenate([self.postcode, postcode[valid].astype(np.int32)])
+
+        return np.unique(codes[valid]), np.unique(postcode[valid].astype(np.int32))
+
+    def _recompute(self, affected_provinces, affected_postcodes):
+        provinces = dict(self.provinces)
+        for code, stats in self._aggregate(self.province_code, affected_provinces):
+            provinces[self.province_names[code]] = stats
+
+        postcodes = dict(self.postcodes)
+        changed_postcodes = []
+        for code, stats in self._aggregate(self.postcode, affected_postcodes):
+            postcodes[str(code)] = stats
+            changed_postcodes.append(str(code))
+
+        overall = summarize(self.price, self.price_per_m2)
+        self._publish(provinces, postcodes, overall, datetime.now().isoformat(), changed_postcodes)
+
+    def _publish(self, provinces, postcodes, overall, updated_at, changed_postcodes=None):
+        """
+        Pre-serialize the responses and swap them in as complete objects,
+        so readers never see a half-updated state
+        """
+        payloads = dict(self.postcode_payloads)
+        for key in postcodes if changed_postcodes is None else changed_postcodes:
+            payloads[key] = json.dumps({"postCode": key, **postcodes[key]}).encode()
+
+        self.provinces = provinces
+        self.postcodes = postcodes
+        self.overall = overall
+        self.updated_at = updated_at
+        self.postcode_payloads = payloads
+        self.provinces_payload = json.dumps({
+            "provinces": provinces,
+            "overall": overall,
+            "listings": int(len(self.price)),
+            "updated_at": updated_at
+        }).encode()
+
+    def _aggregate(self, codes, affected):
+        """
+        Yield (group code, stats) for the affected groups in one sort pass
+        """
+        if len(affected) == 0:
+            return
+        rows = np.flatnonzero(np.isin(codes, affected))
+        rows = rows[np.argsort(codes[rows], kind="stable")]
+        bounds = np.flatnonzero(np.diff(codes[rows])) + 1
+        for group in np.split(rows, bounds):
+            yield int(codes[group[0]]), summarize(self.price[group], self.price_per_m2[group])
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as cache:
+                meta = json.loads(str(cache["meta"]))
+                if meta["listings_path"] != os.path.abspath(self.listings_path):
+                    return False
+                if meta["offset"] > os.path.getsize(self.listings_path):
+                    return False
+                self.price = cache["price"]
+                self.price_per_m2 = cache["price_per_m2"]
+                self.province_code = cache["province_code"]
+                self.postcode = cache["postcode"]
+            self.province_names = meta["province_names"]
+            self.header = meta["header"]
+            self.offset = meta["offset"]
+        except Exception as e:
+            print(f"Warning: ignoring market statistics cache: {e}")
+            return False
+
+        print(f"Loaded {len(self.price)} listings from {self.cache_path}")
+        self._publish(meta["provinces"], meta["postcodes"], meta["overall"], meta["updated_at"])
+        return True
+
+    def _save_cache(self):
+        meta = {
+            "listings_path": os.path.abspath(self.listings_path),
+            "offset": self.offset,
+            "header": self.header,
+            "province_names": self.province_names,
+            "provinces": self.provinces,
+            "postcodes": self.postcodes,
+            "overall": self.overall,
+            "updated_at": self.updated_at,
+        }
+        try:
+            tmp_path = f"{self.cache_path}.tmp.npz"
+            np.savez(
+                tmp_path,
+                price=self.price,
+                price_per_m2=self.price_per_m2,
+                province_code=self.province_code,
+                postcode=self.postcode,
+                meta=np.array(json.dumps(meta))
+            )
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Warning: could not write market statistics cache: {e}")
+
+def summarize(price, price_per_m2):
+    """
+    Aggregates for one group of listings
+    """
+    if len(price) == 0:
+        return {"count": 0}
+    quantiles = np.quantile(price, QUANTILES)
+    stats = {
+        "count": int(len(price)),
+        "median_price": round(float(quantiles[2]), 2),
+        "mean_price": round(float(price.mean(dtype=np.float64)), 2),
+        "price_quantiles": {f"p{int(q * 100)}": round(float(v), 2) for q, v in zip(QUANTILES, quantiles)},
+        "median_price_per_m2": None,
+        "mean_price_per_m2": None,
+    }
+    price_per_m2 = price_per_m2[~np.isnan(price_per_m2)]
+    if len(price_per_m2):
+        stats["median_price_per_m2"] = round(float(np.median(price_per_m2)), 2)
+        stats["mean_price_per_m2"] = round(float(price_per_m2.mean(dtype=np.float64)), 2)
+    return stats
@@ -0,0 +1,263 @@
+"""
+Train the price model and save it as a bundle the API loads directly
+
+Listings are read from a CSV (request fields plus the target price) in
+chunks and encoded with the same FeaturePipeline the API uses; the pipeline
+is saved in the bundle next to the model. Trees are grown with the XGBoost
+`hist` method on every available core. With --external-memory the encoded
+chunks are streamed from the CSV on every pass and the quantized data is
+cached on disk, so the training set does not have to fit in RAM.
+
+Every run prints, and appends to --runs-log, its timings and validation
+metrics (MAE, RMSE, MAPE, R²). The distribution of the encoded validation
+rows is saved as the baseline of the API's drift monitor (--drift-baseline);
+--baseline-only writes just that file, for a model trained earlier.
+
+    python model/run_model_trainer.py --data data/listings.csv --output model/Immo_ML.pkl
+    python model/run_model_trainer.py --data data/listings.csv --external-memory --cache-dir /tmp/xgb-cache
+    python model/run_model_trainer.py --data data/listings.csv --baseline-only
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preprocessing.preprocess import load_geo_data, DEFAULT_CHUNK_SIZE
+from preprocessing.pipeline import FeaturePipeline
+from predict.predict import save_bundle, BUNDLE_VERSION
+from serving.drift import build_baseline, save_baseline
+
+DEFAULT_PARAMS = {
+    "objective": "reg:squarederror",
+    "tree_method": "hist",
+    "max_depth": 6,
+    "learning_rate": 0.05,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "min_child_weight": 1,
+    "max_bin": 256,
+    "seed": 0,
+}
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def validation_mask(row_ids, fraction, seed):
+    """
+    Deterministic split on the global row number, independent of the chunk size
+    """
+    hashed = ((row_ids.astype(np.uint64) + np.uint64(seed)) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    return hashed.astype(np.float64) / 2 ** 32 < fraction
+
+
+def encoded_chunks(path, pipeline, target, chunk_size):
+    """
+    (features, prices, row ids) per CSV chunk, rows without a positive price dropped
+    """
+    first_row = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype={"postCode": str}):
+        row_ids = np.arange(first_row, first_row + len(chunk))
+        first_row += len(chunk)
+        prices = pd.to_numeric(chunk[target], errors="coerce").to_numpy(dtype=np.float32)
+        keep = prices > 0
+        if not keep.all():
+            chunk, prices, row_ids = chunk[keep], prices[keep], row_ids[keep]
+        yield pipeline.transform_frame(chunk, dtype=np.float32), prices, row_ids
+
+
+def load_split(path, pipeline, target, chunk_size, valid_fraction, seed, max_valid_rows=None, keep_train=True):
+    """
+    Read the whole CSV once; returns (train frames, train prices, valid frame, valid prices)
+    """
+    train_x, train_y, valid_x, valid_y = [], [], [], []
+    n_valid = 0
+    for features, prices, row_ids in encoded_chunks(path, pipeline, target, chunk_size):
+        is_valid = validation_mask(row_ids, valid_fraction, seed)
+        if max_valid_rows is None or n_valid < max_valid_rows:
+            valid_x.append(features[is_valid])
+            valid_y.append(prices[is_valid])
+            n_valid += int(is_valid.sum())
+        if keep_train:
+            train_x.append(features[~is_valid])
+            train_y.append(prices[~is_valid])
+    valid = pd.concat(valid_x, ignore_index=True) if valid_x else None
+    return train_x, train_y, valid, np.concatenate(valid_y) if valid_y else None
+
+
+class ChunkIter(xgb.DataIter):
+    """
+    Streams the training rows of the CSV to XGBoost, one chunk per batch
+    """
+
+    def __init__(self, path, pipeline, target, chunk_size, valid_fraction, seed, cache_prefix):
+        self.args = (path, pipeline, target, chunk_size)
+        self.valid_fraction = valid_fraction
+        self.seed = seed
+        self.rows = 0
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = encoded_chunks(*self.args)
+            self.rows = 0
+        for features, prices, row_ids in self._chunks:
+            is_train = ~validation_mask(row_ids, self.valid_fraction, self.seed)
+            if is_train.any():
+                self.rows += int(is_train.sum())
+                input_data(data=features[is_train], label=prices[is_train])
+                return True
+        return False
+
+    def reset(self):
+        self._chunks = None
+
+
+def regression_metrics(actual, predicted):
+    errors = predicted - actual
+    return {
+        "mae": float(np.mean(np.abs(errors))),
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "mape": float(np.mean(np.abs(errors) / np.maximum(actual, 1.0)) * 100),
+        "r2": float(1 - np.sum(errors ** 2) / max(np.sum((actual - actual.mean()) ** 2), 1e-12)),
+    }
+
+
+def as_regressor(booster, params, n_estimators, nthread):
+    """
+    Wrap a trained Booster in the XGBRegressor interface the API expects
+    """
+    sklearn_params = {key: value for key, value in params.items() if key not in ("seed", "nthread")}
+    model = xgb.XGBRegressor(n_estimators=n_estimators, n_jobs=nthread, random_state=params["seed"], **sklearn_params)
+    model.load_model(bytearray(booster.save_raw("json")))
+    return model
+
+
+def train(args):
+    started = time.perf_counter()
+    pipeline = FeaturePipeline.with_geo(load_geo_data())
+    nthread = args.nthread or available_cores()
+    params = {**DEFAULT_PARAMS, "max_depth": args.max_depth, "learning_rate": args.learning_rate,
+              "max_bin": args.max_bin, "seed": args.seed, "nthread": nthread}
+
+    load_started = time.perf_counter()
+    if args.external_memory:
+        # Validation rows are kept in memory (capped), the training rows are streamed
+        _, _, valid_x, valid_y = load_split(args.data, pipeline, args.target, args.chunk_size, args.valid_fraction,
+                                            args.seed, max_valid_rows=args.max_valid_rows, keep_train=False)
+        cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="immo-xgb-")
+        batches = ChunkIter(args.data, pipeline, args.target, args.chunk_size, args.valid_fraction, args.seed,
+                            cache_prefix=os.path.join(cache_dir, "train"))
+        dtrain = xgb.ExtMemQuantileDMatrix(batches, max_bin=args.max_bin, nthread=nthread)
+        train_rows = batches.rows
+    else:
+        train_x, train_y, valid_x, valid_y = load_split(args.data, pipeline, args.target, args.chunk_size,
+                                                        args.valid_fraction, args.seed)
+        train_frame = pd.concat(train_x, ignore_index=True)
+        del train_x
+        dtrain = xgb.QuantileDMatrix(train_frame, label=np.concatenate(train_y), max_bin=args.max_bin, nthread=nthread)
+        train_rows = len(train_frame)
+        del train_frame
+    dvalid = xgb.QuantileDMatrix(valid_x, label=valid_y, ref=dtrain, nthread=nthread)
+    load_seconds = time.perf_counter() - load_started
+    print(f"Encoded {train_rows} training and {len(valid_y)} validation rows in {load_seconds:.1f}s")
+
+    fit_started = time.perf_counter()
+    booster = xgb.train(params, dtrain, num_boost_round=args.n_estimators, evals=[(dvalid, "valid")],
+                        early_stopping_rounds=args.early_stopping_rounds, verbose_eval=args.verbose_eval)
+    fit_seconds = time.perf_counter() - fit_started
+
+    # Keep only the rounds up to the best validation score
+    best_rounds = booster.best_iteration + 1
+    booster = booster[:best_rounds]
+    metrics = regression_metrics(valid_y.astype(np.float64), booster.predict(dvalid).astype(np.float64))
+
+    report = {
+        "run_at": datetime.now().isoformat(),
+        "data": os.path.abspath(args.data),
+        "mode": "external_memory" if args.external_memory else "in_memory",
+        "train_rows": train_rows,
+        "valid_rows": int(len(valid_y)),
+        "params": params,
+        "rounds": best_rounds,
+        "nthread": nthread,
+        "xgboost_version": xgb.__version__,
+        "load_seconds": round(load_seconds, 3),
+        "fit_seconds": round(fit_seconds, 3),
+        "metrics": {name: round(value, 4) for name, value in metrics.items()},
+    }
+
+    if args.drift_baseline:
+        save_baseline(build_baseline(valid_x), args.drift_baseline)
+        report["drift_baseline"] = os.path.abspath(args.drift_baseline)
+
+    model = as_regressor(booster, params, best_rounds, nthread)
+    save_bundle(model, pipeline, args.output, training=report)
+    with open(args.output, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    report["artifact"] = {"path": os.path.abspath(args.output), "sha256": sha256, "bundle_version": BUNDLE_VERSION}
+    report["total_seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the XGBoost price model")
+    parser.add_argument("--data", default="data/listings.csv", help="Listings CSV (request fields + price)")
+    parser.add_argument("--target", default="price")
+    parser.add_argument("--output", default="model/Immo_ML.pkl")
+    parser.add_argument("--runs-log", default="model/training_runs.jsonl", help="Append the run report to this file")
+    parser.add_argument("--n-estimators", type=int, default=1000)
+    parser.add_argument("--early-stopping-rounds", type=int, default=50)
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_PARAMS["max_depth"])
+    parser.add_argument("--learning-rate", type=float, default=DEFAULT_PARAMS["learning_rate"])
+    parser.add_argument("--max-bin", type=int, default=DEFAULT_PARAMS["max_bin"])
+    parser.add_argument("--nthread", type=int, help="Training threads (default: every available core)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--valid-fraction", type=float, default=0.2)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--external-memory", action="store_true", help="Stream training chunks instead of loading them")
+    parser.add_argument("--cache-dir", help="Directory for the external-memory cache (default: a temporary one)")
+    parser.add_argument("--max-valid-rows", type=int, default=500000, help="Validation rows kept in external-memory mode")
+    parser.add_argument("--verbose-eval", type=int, default=100)
+    parser.add_argument("--drift-baseline", default="model/drift_baseline.json",
+                        help="Save the validation feature distribution here for drift monitoring (empty: skip)")
+    parser.add_argument("--baseline-only", action="store_true", help="Only write --drift-baseline, do not train")
+    args = parser.parse_args()
+
+    if args.baseline_only:
+        pipeline = FeaturePipeline.with_geo(load_geo_data())
+        _, _, valid_x, _ = load_split(args.data, pipeline, args.target, args.chunk_size, args.valid_fraction,
+                                      args.seed, max_valid_rows=args.max_valid_rows, keep_train=False)
+        save_baseline(build_baseline(valid_x), args.drift_baseline)
+        print(f"Saved the drift baseline of {len(valid_x)} rows to {args.drift_baseline}")
+        return
+
+    report = train(args)
+    metrics = report["metrics"]
+    print(f"Trained {report['rounds']} rounds on {report['train_rows']} rows with {report['nthread']} threads "
+          f"in {report['fit_seconds']:.1f}s")
+    print(f"Validation: MAE {metrics['mae']:,.0f}  RMSE {metrics['rmse']:,.0f}  "
+          f"MAPE {metrics['mape']:.2f}%  R² {metrics['r2']:.4f}")
+    print(f"Saved {args.output} (sha256 {report['artifact']['sha256'][:12]})")
+
+    if args.runs_log:
+        with open(args.runs_log, "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import xgboost as xgb
+
+try:
+    from predict.predict import EXPECTED_COLUMNS, prepare_features
+except ImportError:
+    from predict import EXPECTED_COLUMNS, prepare_features
+
+class ContributionExplainer:
+    """
+    Per-feature price contributions from XGBoost's native TreeSHAP (pred_contribs)
+    Whole batches go through the booster in one call, and the contributions of
+    feature vectors seen before are served from an LRU cache
+    """
+
+    def __init__(self, model, cache_size=4096):
+        self.booster = model.get_booster()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def contributions(self, preprocessed_data):
+        """
+        Return an array of shape (rows, features + 1), the last column being the bias
+        """
+        features = prepare_features(preprocessed_data)
+        keys = [row.tobytes() for row in features.to_numpy(dtype=np.float32)]
+
+        result = np.empty((len(keys), len(EXPECTED_COLUMNS) + 1), dtype=np.float64)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    result[i] = cached
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            matrix = xgb.DMatrix(features.iloc[missing])
+            computed = self.booster.predict(matrix, pred_contribs=True)
+            result[missing] = computed
+            with self._lock:
+                for i, row in zip(missing, computed):
+                    self._cache[keys[i]] = row
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return result
+
+    def explain(self, preprocessed_data, top_k=None):
+        """
+        Explanations for every row: predicted price, base value and contributions
+        With top_k, only the largest contributions are listed and the rest is
+        summed into "other", so the contributions still add up to the price
+        """
+        explanations = []
+        for row in self.contributions(preprocessed_data):
+            base_value = float(row[-1])
+            contributions = sorted(zip(EXPECTED_COLUMNS, row[:-1]), key=lambda item: abs(item[1]), reverse=True)
+            listed = contributions if top_k is None else contributions[:top_k]
+
+            explanation = {
+                "predicted_price": round(float(row.sum()), 2),
+                "base_value": round(base_value, 2),
+                "contributions": {name: round(float(value), 2) for name, value in listed},
+            }
+            if top_k is not None and len(contributions) > top_k:
+                explanation["contributions"]["other"] = round(float(sum(value for _, value in contributions[top_k:])), 2)
+            explanations.append(explanation)
+        return explanations
+
+    def stats(self):
+        return {
+            "cache_size": len(self._cache),
+            "cache_capacity": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
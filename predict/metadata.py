@@ -0,0 +1,151 @@
+import hashlib
+import json
+import math
+import pickle
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+try:
+    from predict.predict import EXPECTED_COLUMNS
+except ImportError:
+    from predict import EXPECTED_COLUMNS
+
+IMPORTANCE_TYPES = ("gain", "total_gain", "cover", "weight")
+# Thread settings of this process, not properties of the model
+RUNTIME_PARAMETERS = ("n_jobs", "nthread")
+
+class ModelMetadata:
+    """
+    Everything /model/info reports, computed once when the model is loaded
+    The response body is serialized up front and identified by a strong ETag
+    version is a short id of the artifact (its sha256 prefix) for audit records
+    Both only depend on the artifact and the model parameters, so every worker
+    and every restart serving the same model agree on them; loaded_at is kept
+    out of the body and sent as its Last-Modified header instead
+    """
+
+    def __init__(self, model, model_path=None, pipeline=None):
+        # HTTP dates have whole seconds
+        self.loaded_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self.info = build_model_info(model, model_path, pipeline)
+        self.payload = json.dumps(self.info, separators=(",", ":")).encode()
+        artifact = self.info["artifact"]
+        # Without an artifact file, the serialized booster stands in for it
+        content = artifact["sha256"] if artifact else model_digest(model)
+        parameters = json.dumps(self.info.get("parameters"), sort_keys=True, separators=(",", ":"))
+        identity = hashlib.sha256(f"{content}|{parameters}".encode()).hexdigest()
+        self.etag = f'"{identity[:32]}"'
+        self.version = content[:12]
+
+    @property
+    def last_modified(self):
+        return format_datetime(self.loaded_at, usegmt=True)
+
+def build_model_info(model, model_path=None, pipeline=None):
+    """
+    Feature names, importances, tree statistics and artifact details
+    pipeline is the FeaturePipeline bundled with the model, if any
+    """
+    info = {
+        "model_type": str(type(model).__name__),
+        "status": "loaded",
+        "artifact": artifact_info(model_path),
+        "feature_names": list(EXPECTED_COLUMNS),
+        "feature_pipeline": pipeline_info(pipeline),
+    }
+
+    if hasattr(model, "get_params"):
+        info["parameters"] = {key: json_safe(value) for key, value in model.get_params().items()
+                              if key not in RUNTIME_PARAMETERS}
+
+    if not hasattr(model, "get_booster"):
+        return info
+
+    booster = model.get_booster()
+    feature_names = booster.feature_names or list(EXPECTED_COLUMNS)
+    info["feature_names"] = list(feature_names)
+
+    importances = {}
+    for importance_type in IMPORTANCE_TYPES:
+        scores = booster.get_score(importance_type=importance_type)
+        importances[importance_type] = {name: round(float(scores.get(name, 0.0)), 6) for name in feature_names}
+    info["importances"] = importances
+
+    if hasattr(model, "feature_importances_"):
+        ranked = sorted(zip(feature_names, model.feature_importances_), key=lambda x: x[1], reverse=True)
+        info["top_features"] = [[name, round(float(value), 6)] for name, value in ranked[:10]]
+
+    info["trees"] = tree_statistics(booster)
+    return info
+
+def model_digest(model):
+    """
+    sha256 of the model's serialized booster (of its pickle for other models)
+    """
+    if hasattr(model, "get_booster"):
+        return hashlib.sha256(bytes(model.get_booster().save_raw("ubj"))).hexdigest()
+    return hashlib.sha256(pickle.dumps(model)).hexdigest()
+
+def pipeline_info(pipeline):
+    if pipeline is None:
+        return {"bundled": False}
+    state = pipeline.to_dict()
+    return {"bundled": True, "version": state["version"], "postcodes": len(state["geo"])}
+
+def artifact_info(model_path):
+    if model_path is None:
+        return None
+    digest = hashlib.sha256()
+    size = 0
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+            size += len(block)
+    return {"path": model_path, "sha256": digest.hexdigest(), "size_bytes": size}
+
+def tree_statistics(booster):
+    """
+    Tree count, boosting rounds, depth and leaf statistics from the booster's JSON dump
+    """
+    depths = []
+    leaves = []
+    for tree in booster.get_dump(dump_format="json"):
+        depth, leaf_count = _walk(json.loads(tree))
+        depths.append(depth)
+        leaves.append(leaf_count)
+
+    if not depths:
+        return {"count": 0}
+    return {
+        "count": len(depths),
+        "boosting_rounds": booster.num_boosted_rounds(),
+        "max_depth": max(depths),
+        "mean_depth": round(sum(depths) / len(depths), 3),
+        "total_leaves": sum(leaves),
+        "mean_leaves": round(sum(leaves) / len(leaves), 3),
+    }
+
+def _walk(node):
+    """
+    Return (depth, leaves) of the subtree rooted at node
+    """
+    children = node.get("children")
+    if not children:
+        return 0, 1
+    depth, leaves = 0, 0
+    for child in children:
+        child_depth, child_leaves = _walk(child)
+        depth = max(depth, child_depth)
+        leaves += child_leaves
+    return depth + 1, leaves
+
+def json_safe(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items()}
+    return str(value)
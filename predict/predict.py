@@ -1,15 +1,62 @@
 import joblib
+import logging
+import numpy as np
 import pandas as pd
 import os
+from datetime import datetime
 
-def predict(preprocessed_data, model_path="model/Immo_ML.pkl"):
+try:
+    from preprocessing.pipeline import FEATURE_COLUMNS, FeaturePipeline
+except ImportError:
+    from pipeline import FEATURE_COLUMNS, FeaturePipeline
+
+# The model expects features in this exact order
+EXPECTED_COLUMNS = FEATURE_COLUMNS
+
+# Model artifacts saved by save_bundle() carry the feature pipeline they were trained with
+BUNDLE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+def prepare_features(preprocessed_data):
+    """
+    Order, type and fill the preprocessed columns the way the model expects
+    """
+    # Convert to DataFrame if it's a dict
+    if isinstance(preprocessed_data, dict):
+        data = pd.DataFrame([preprocessed_data])
+    else:
+        data = preprocessed_data.copy()
+    
+    # Reorder columns to match expected order
+    data = data[EXPECTED_COLUMNS]
+    
+    # Convert to numeric types
+    for col in EXPECTED_COLUMNS:
+        data[col] = pd.to_numeric(data[col], errors='coerce')
+    
+    # Fill any NaN values that might have been created
+    return data.fillna(0)
+
+def predict_with_model(model, data, iteration_range=None):
+    """
+    Run model.predict, optionally limited to a prefix of the boosting rounds
+    """
+    if iteration_range is None:
+        return model.predict(data)
+    return model.predict(data, iteration_range=iteration_range)
+
+def predict(preprocessed_data, model_path="model/Immo_ML.pkl", model=None, iteration_range=None):
     """
     Predict house price using trained XGBoost model
     Takes preprocessed data as input and returns predicted price
+    Pass an already loaded model to skip reading it from disk, and an
+    iteration_range such as (0, K) to only use the first K boosting rounds
     """
     try:
         # Load the model
-        model = joblib.load(model_path)
+        if model is None:
+            model, _ = unpack_artifact(joblib.load(model_path))
         
         # Convert to DataFrame if it's a dict
         if isinstance(preprocessed_data, dict):
@@ -17,42 +64,14 @@ def predict(preprocessed_data, model_path="model/Immo_ML.pkl"):
         else:
             data = preprocessed_data.copy()
         
-        # Debug: Print the data shape and columns
-        print(f"Data shape: {data.shape}")
-        print(f"Data columns: {list(data.columns)}")
-        print(f"Data dtypes:\n{data.dtypes}")
-        print(f"Data values:\n{data.iloc[0].to_dict()}")
-        
-        # Ensure the data has the correct column order expected by the model
-        # This is crucial - the model expects features in a specific order
-        expected_columns = [
-            'bedroomCount', 'bathroomCount', 'habitableSurface', 'toiletCount',
-            'terraceSurface', 'gardenSurface', 'province_encoded',
-            'type_encoded', 'subtype_encoded', 'epcScore_encoded', 'hasAttic_encoded',
-            'hasGarden_encoded', 'hasAirConditioning_encoded', 'hasArmoredDoor_encoded',
-            'hasVisiophone_encoded', 'hasTerrace_encoded', 'hasOffice_encoded',
-            'hasSwimmingPool_encoded', 'hasFireplace_encoded', 'hasBasement_encoded',
-            'hasDressingRoom_encoded', 'hasDiningRoom_encoded', 'hasLift_encoded',
-            'hasHeatPump_encoded', 'hasPhotovoltaicPanels_encoded', 'hasLivingRoom_encoded',
-            'lat', 'lon'
-        ]
+        logger.debug("Data shape: %s, columns: %s", data.shape, list(data.columns))
         
-        # Reorder columns to match expected order
-        data = data[expected_columns]
-        
-        # Convert to numeric types
-        for col in expected_columns:
-            data[col] = pd.to_numeric(data[col], errors='coerce')
-        
-        # Fill any NaN values that might have been created
-        data = data.fillna(0)
-        
-        print(f"Final data for prediction:\n{data.iloc[0].to_dict()}")
+        data = prepare_features(data)
         
         # Make prediction
-        prediction = model.predict(data)
+        prediction = predict_with_model(model, data, iteration_range)
         
-        print(f"Raw prediction: {prediction}")
+        logger.debug("Raw prediction: %s", prediction)
         
         # Return the prediction (single value)
         return float(prediction[0])
@@ -63,35 +82,134 @@ def predict(preprocessed_data, model_path="model/Immo_ML.pkl"):
         traceback.print_exc()
         return None
 
-def load_model(model_path="model/Immo_ML.pkl"):
+def predict_row(row, model, iteration_range=None):
     """
-    Load the trained XGBoost model
+    Predict the price of one encoded feature row (FEATURE_COLUMNS order, as
+    FeaturePipeline.encode_fields builds it) straight from the array: no
+    DataFrame and no prepare_features pass over columns already numeric
+    Returns the price, or None on failure like predict()
     """
     try:
-        # Try different possible paths
-        possible_paths = [
-            model_path,
-            "Immo_ML.pkl",
-            "../model/Immo_ML.pkl",
-            "../../model/Immo_ML.pkl",
-            "./model/Immo_ML.pkl"
-        ]
-        
-        model = None
-        for path in possible_paths:
-            if os.path.exists(path):
-                print(f"Loading model from: {path}")
-                model = joblib.load(path)
-                break
+        # The booster works in float32 whatever it is given
+        data = np.asarray(row, dtype=np.float32).reshape(1, -1)
+        return float(predict_with_model(model, data, iteration_range)[0])
         
+    except Exception as e:
+        print(f"Error making prediction: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def predict_batch(preprocessed_data, model_path="model/Immo_ML.pkl", model=None, iteration_range=None):
+    """
+    Predict prices for every row of a preprocessed DataFrame
+    Returns a list of prices in row order, or None on failure
+    """
+    try:
         if model is None:
-            print(f"Model file not found in any of these locations: {possible_paths}")
+            model, _ = unpack_artifact(joblib.load(model_path))
+        
+        data = prepare_features(preprocessed_data)
+        logger.debug("Batch prediction for %d rows", len(data))
+        
+        predictions = predict_with_model(model, data, iteration_range)
+        return [float(price) for price in predictions]
+        
+    except Exception as e:
+        print(f"Error making batch prediction: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def set_model_threads(model, nthread):
+    """
+    Limit the threads XGBoost uses for one prediction with this model
+    """
+    if hasattr(model, "set_params"):
+        model.set_params(n_jobs=nthread)
+    else:
+        model.set_param({"nthread": nthread})
+
+def find_model_path(model_path="model/Immo_ML.pkl"):
+    """
+    Return the first existing model file among the usual locations, or None
+    """
+    # Try different possible paths
+    possible_paths = [
+        model_path,
+        "Immo_ML.pkl",
+        "../model/Immo_ML.pkl",
+        "../../model/Immo_ML.pkl",
+        "./model/Immo_ML.pkl"
+    ]
+    
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    
+    print(f"Model file not found in any of these locations: {possible_paths}")
+    return None
+
+def load_model(model_path="model/Immo_ML.pkl"):
+    """
+    Load the trained XGBoost model
+    """
+    try:
+        path = find_model_path(model_path)
+        if path is None:
             return None
-            
+        
+        print(f"Loading model from: {path}")
+        model, _ = unpack_artifact(joblib.load(path))
         return model
         
     except Exception as e:
         print(f"Error loading model: {e}")
         import traceback
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+def save_bundle(model, pipeline, model_path="model/Immo_ML.pkl", training=None):
+    """
+    Save the model together with the FeaturePipeline state it was trained with
+    training is an optional report of the run that produced the model
+    The file is replaced atomically, so a process loading it never sees a partial write
+    """
+    tmp_path = f"{model_path}.tmp"
+    joblib.dump({
+        "bundle_version": BUNDLE_VERSION,
+        "model": model,
+        "pipeline": pipeline.to_dict(),
+        "created_at": datetime.now().isoformat(),
+        "training": training,
+    }, tmp_path)
+    os.replace(tmp_path, model_path)
+
+def unpack_artifact(artifact):
+    """
+    (model, pipeline) from a loaded artifact; pipeline is None for a bare model
+    """
+    if isinstance(artifact, dict) and "bundle_version" in artifact:
+        if artifact["bundle_version"] != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported model bundle version: {artifact['bundle_version']}")
+        return artifact["model"], FeaturePipeline.from_dict(artifact["pipeline"])
+    return artifact, None
+
+def load_bundle(model_path="model/Immo_ML.pkl"):
+    """
+    Load a model and its feature pipeline; older artifacts hold only the model,
+    in which case the pipeline is None and callers fall back to FeaturePipeline()
+    """
+    try:
+        path = find_model_path(model_path)
+        if path is None:
+            return None, None
+        
+        print(f"Loading model from: {path}")
+        return unpack_artifact(joblib.load(path))
+        
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, None
@@ -0,0 +1,355 @@
+import re
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+# Belgium centre, used when a postal code has no known coordinates
+DEFAULT_LAT = 50.8503
+DEFAULT_LON = 4.3517
+
+# Category encodings
+PROVINCE_MAPPING = {
+    "Brussels": 1, "Brussels-Capital": 1, "Brussels-Capital Region": 1,
+    "Luxembourg": 2,
+    "Antwerp": 3, "Anvers": 3,
+    "Flemish Brabant": 4, "FlemishBrabant": 4,
+    "East Flanders": 5, "EastFlanders": 5,
+    "West Flanders": 6, "WestFlanders": 6,
+    "Liège": 7, "Liege": 7,
+    "Walloon Brabant": 8, "WalloonBrabant": 8,
+    "Limburg": 9,
+    "Namur": 10,
+    "Hainaut": 11,
+}
+
+TYPE_MAPPING = {"APARTMENT": 1, "HOUSE": 2, "apartment": 1, "house": 2}
+
+SUBTYPE_MAPPING = {
+    "APARTMENT": 1, "apartment": 1,
+    "HOUSE": 2, "house": 2,
+    "FLAT_STUDIO": 3, "FLATSTUDIO": 3, "flat_studio": 3,
+    "DUPLEX": 4, "duplex": 4,
+    "PENTHOUSE": 5, "penthouse": 5,
+    "GROUND_FLOOR": 6, "GROUNDFLOOR": 6, "ground_floor": 6,
+    "APARTMENT_BLOCK": 7, "APARTMENTBLOCK": 7,
+    "MANSION": 8, "mansion": 8,
+    "EXCEPTIONAL_PROPERTY": 9, "EXCEPTIONALPROPERTY": 9,
+    "MIXED_USE_BUILDING": 10, "MIXEDUSEBUILDING": 10,
+    "TRIPLEX": 11, "triplex": 11,
+    "LOFT": 12, "loft": 12,
+    "VILLA": 13, "villa": 13,
+    "TOWN_HOUSE": 14, "TOWNHOUSE": 14, "town_house": 14,
+    "CHALET": 15, "chalet": 15,
+    "MANOR_HOUSE": 16, "MANORHOUSE": 16,
+    "SERVICE_FLAT": 17, "SERVICEFLAT": 17,
+    "KOT": 18, "kot": 18,
+    "FARMHOUSE": 19, "farmhouse": 19,
+    "BUNGALOW": 20, "bungalow": 20,
+    "COUNTRY_COTTAGE": 21, "COUNTRYCOTTAGE": 21,
+    "OTHER_PROPERTY": 22, "OTHERPROPERTY": 22,
+    "CASTLE": 23, "castle": 23,
+    "PAVILION": 24, "pavilion": 24,
+}
+
+EPC_MAPPING = {"A+": 8, "A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1}
+
+# Raw column -> (encoded column, mapping)
+CATEGORICAL_FEATURES = {
+    "province": ("province_encoded", PROVINCE_MAPPING),
+    "type": ("type_encoded", TYPE_MAPPING),
+    "subtype": ("subtype_encoded", SUBTYPE_MAPPING),
+    "epcScore": ("epcScore_encoded", EPC_MAPPING),
+}
+
+BOOLEAN_FEATURES = [
+    "hasAttic", "hasGarden", "hasAirConditioning", "hasArmoredDoor",
+    "hasVisiophone", "hasTerrace", "hasOffice", "hasSwimmingPool",
+    "hasFireplace", "hasBasement", "hasDressingRoom", "hasDiningRoom",
+    "hasLift", "hasHeatPump", "hasPhotovoltaicPanels", "hasLivingRoom"
+]
+
+NUMERIC_DEFAULTS = {
+    'bedroomCount': 2.0,
+    'bathroomCount': 1.0,
+    'habitableSurface': 100.0,
+    'toiletCount': 1.0,
+    'terraceSurface': 0.0,
+    'gardenSurface': 0.0,
+}
+
+# Every model input with its default value, in the order the model expects
+FEATURE_DEFAULTS = {
+    **NUMERIC_DEFAULTS,
+    'province_encoded': 1.0,
+    'type_encoded': 1,
+    'subtype_encoded': 1,
+    'epcScore_encoded': 4.0,
+    **{f"{feature}_encoded": 0 for feature in BOOLEAN_FEATURES},
+    'hasLivingRoom_encoded': 1,
+    'lat': DEFAULT_LAT,
+    'lon': DEFAULT_LON
+}
+
+FEATURE_COLUMNS = list(FEATURE_DEFAULTS)
+
+PIPELINE_VERSION = 1
+
+_SEPARATORS = re.compile(r"[\s_\-]+")
+
+def normalize_category(value):
+    """
+    Lookup key for a category label: upper case, without spaces, '_' or '-'
+    """
+    if isinstance(value, Enum):
+        value = value.value
+    return _SEPARATORS.sub("", str(value)).upper()
+
+class Category(str, Enum):
+    """
+    Base of the category enums: one member per code, valued with its
+    canonical label; member.code is the model encoding
+    """
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Member for any spelling the mapping accepts, matched case- and
+        separator-insensitively; ValueError for unknown labels
+        """
+        if value is None or isinstance(value, cls):
+            return value
+        member = cls._lookup.get(normalize_category(value))
+        if member is None:
+            raise ValueError(f"unknown {cls.__name__} {value!r}, expected one of: {', '.join(m.value for m in cls)}")
+        return member
+
+def category_enum(name, mapping):
+    """
+    Category enum for a label -> code mapping; the first label of each code is canonical
+    """
+    canonical = {}
+    for label, code in mapping.items():
+        canonical.setdefault(code, label)
+    enum = Category(name, {normalize_category(label): label for label in canonical.values()})
+    for code, label in canonical.items():
+        enum[normalize_category(label)].code = code
+    enum._lookup = {normalize_category(label): enum[normalize_category(canonical[code])]
+                    for label, code in mapping.items()}
+    return enum
+
+Province = category_enum("Province", PROVINCE_MAPPING)
+PropertyType = category_enum("PropertyType", TYPE_MAPPING)
+PropertySubtype = category_enum("PropertySubtype", SUBTYPE_MAPPING)
+EpcScore = category_enum("EpcScore", EPC_MAPPING)
+
+# Raw column -> enum its values are parsed into by the API
+CATEGORY_ENUMS = {"province": Province, "type": PropertyType, "subtype": PropertySubtype, "epcScore": EpcScore}
+
+def normalize_postcode(value):
+    """
+    Lookup key for a postal code, so that 1000, 1000.0 and "1000" all match
+    """
+    key = str(value).strip()
+    return key[:-2] if key.endswith(".0") else key
+
+class FeaturePipeline:
+    """
+    Raw property fields -> model feature matrix, the same way for training and serving
+
+    Mappings, defaults and column order are compiled into lookup tables once;
+    transform() then works on one dict or on a DataFrame of any size, column
+    by column. to_dict()/from_dict() give the plain, versioned state that is
+    saved next to the model (see predict.save_bundle).
+
+    Rules, per raw field:
+    - numeric fields: missing or non-numeric -> default
+    - province/type/subtype/epcScore: matched case- and separator-insensitively,
+      unknown or missing -> default
+    - boolean fields: True -> 1, any other value -> 0, column absent -> default
+    - postCode: looked up in the geo table, unknown or absent -> centre of Belgium
+    """
+
+    def __init__(self, columns=None, defaults=None, categorical=None, boolean_features=None, geo=None):
+        self.columns = list(columns or FEATURE_DEFAULTS)
+        self.defaults = {column: float(value) for column, value in (defaults or FEATURE_DEFAULTS).items()}
+        if categorical is None:
+            categorical = {
+                source: (encoded, {normalize_category(label): code for label, code in mapping.items()})
+                for source, (encoded, mapping) in CATEGORICAL_FEATURES.items()
+            }
+        self.categorical = {source: (encoded, dict(table)) for source, (encoded, table) in categorical.items()}
+        self.boolean_features = list(boolean_features or BOOLEAN_FEATURES)
+        self.geo = {}
+        if geo:
+            self.geo = {normalize_postcode(code): (float(lat), float(lon)) for code, (lat, lon) in geo.items()}
+        self._compile()
+
+    def _compile(self):
+        index = {column: i for i, column in enumerate(self.columns)}
+        self._default_row = np.array([self.defaults[column] for column in self.columns], dtype=np.float64)
+        self._numeric = [(column, index[column]) for column in NUMERIC_DEFAULTS if column in index]
+        self._categorical = [(source, index[encoded], table, self.defaults[encoded], self._trusts_codes(source, table))
+                             for source, (encoded, table) in self.categorical.items() if encoded in index]
+        self._boolean = [(feature, index[f"{feature}_encoded"])
+                         for feature in self.boolean_features if f"{feature}_encoded" in index]
+        self._lat = index.get("lat")
+        self._lon = index.get("lon")
+
+    @staticmethod
+    def _trusts_codes(source, table):
+        """
+        Whether parsed enum members can be encoded with member.code directly,
+        i.e. this pipeline's table agrees with the enum on every label
+        """
+        enum = CATEGORY_ENUMS.get(source)
+        return enum is not None and all(table.get(normalize_category(m.value)) == m.code for m in enum)
+
+    @classmethod
+    def with_geo(cls, geo_df):
+        """
+        Default pipeline with the postal code table from load_geo_data() (may be None)
+        """
+        return cls(geo=geo_table(geo_df))
+
+    def set_geo(self, geo_df):
+        self.geo = geo_table(geo_df)
+
+    def transform(self, house_data, dtype=np.float64):
+        """
+        Encode one dict or a DataFrame into a frame with self.columns, in order
+        """
+        if isinstance(house_data, dict):
+            return self.to_frame(self.transform_one(house_data))
+        return self.transform_frame(house_data, dtype)
+
+    def to_frame(self, row):
+        return pd.DataFrame([row], columns=self.columns)
+
+    def transform_one(self, house_data):
+        """
+        Encode one dict into a feature row (numpy array)
+        """
+        return self.locate(self.encode_fields(house_data), house_data)
+
+    def encode_fields(self, house_data):
+        """
+        Feature row with everything but the coordinates filled in from one dict
+        """
+        row = self._default_row.copy()
+        for column, i in self._numeric:
+            value = house_data.get(column)
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if not np.isnan(value):
+                row[i] = value
+
+        for source, i, table, default, trusted in self._categorical:
+            value = house_data.get(source)
+            if value is None:
+                continue
+            if trusted and isinstance(value, Category):
+                # Already resolved while the request was validated
+                row[i] = value.code
+            else:
+                row[i] = table.get(normalize_category(value), default)
+
+        for feature, i in self._boolean:
+            if feature in house_data:
+                row[i] = 1.0 if house_data[feature] == True else 0.0  # noqa: E712
+        return row
+
+    def locate(self, row, house_data):
+        """
+        Set the coordinates of row from the postal code in house_data
+        """
+        if self._lat is not None and "postCode" in house_data:
+            lat, lon = self.geo.get(normalize_postcode(house_data["postCode"]), (DEFAULT_LAT, DEFAULT_LON))
+            row[self._lat] = lat
+            row[self._lon] = lon
+        return row
+
+    def transform_frame(self, df, dtype=np.float64):
+        """
+        Encode a DataFrame, working on whole columns
+
+        Categorical columns are mapped per distinct value (pd.Categorical), so
+        the Python-level work grows with the number of labels, not rows. The
+        only full-size allocation is the output; float32 halves it and gives
+        the same predictions, since XGBoost works in float32 anyway.
+        """
+        n_rows = len(df)
+        # Fortran order: every feature is one contiguous column, and the
+        # DataFrame below wraps the array without copying it
+        out = np.empty((n_rows, len(self.columns)), dtype=dtype, order="F")
+        out[:] = self._default_row
+
+        for column, i in self._numeric:
+            if column in df.columns:
+                values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                np.copyto(out[:, i], values, where=~np.isnan(values), casting="unsafe")
+
+        for source, i, table, default, trusted in self._categorical:
+            if source in df.columns:
+                def encode(label, table=table, default=default, trusted=trusted):
+                    if trusted and isinstance(label, Category):
+                        return label.code
+                    return table.get(normalize_category(label), default)
+                out[:, i] = self._lookup(df[source], encode, default)
+
+        for feature, i in self._boolean:
+            if feature in df.columns:
+                out[:, i] = (df[feature].to_numpy() == True)  # noqa: E712 (elementwise)
+
+        if self._lat is not None and "postCode" in df.columns:
+            default = (DEFAULT_LAT, DEFAULT_LON)
+            codes = pd.Categorical(df["postCode"])
+            keys = [normalize_postcode(code) for code in codes.categories]
+            lat = np.array([self.geo.get(key, default)[0] for key in keys] + [DEFAULT_LAT])
+            lon = np.array([self.geo.get(key, default)[1] for key in keys] + [DEFAULT_LON])
+            # Missing values have code -1, which picks the default appended last
+            out[:, self._lat] = lat[codes.codes]
+            out[:, self._lon] = lon[codes.codes]
+
+        return pd.DataFrame(out, columns=self.columns, index=df.index, copy=False)
+
+    @staticmethod
+    def _lookup(series, encode, default):
+        codes = pd.Categorical(series)
+        table = np.array([encode(label) for label in codes.categories] + [default], dtype=np.float64)
+        return table[codes.codes]
+
+    def to_dict(self):
+        return {
+            "version": PIPELINE_VERSION,
+            "columns": list(self.columns),
+            "defaults": dict(self.defaults),
+            "categorical": {source: [encoded, dict(table)] for source, (encoded, table) in self.categorical.items()},
+            "boolean_features": list(self.boolean_features),
+            "geo": {code: list(coords) for code, coords in self.geo.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get("version") != PIPELINE_VERSION:
+            raise ValueError(f"Unsupported feature pipeline version: {state.get('version')}")
+        return cls(
+            columns=state["columns"],
+            defaults=state["defaults"],
+            categorical={source: (encoded, table) for source, (encoded, table) in state["categorical"].items()},
+            boolean_features=state["boolean_features"],
+            geo=state["geo"],
+        )
+
+def geo_table(geo_df):
+    """
+    {postCode: (lat, lon)} from the load_geo_data() table
+    """
+    if geo_df is None:
+        return {}
+    return {normalize_postcode(code): (float(lat), float(lon))
+            for code, lat, lon in zip(geo_df["postCode"], geo_df["lat"], geo_df["lon"])}
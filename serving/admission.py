@@ -0,0 +1,63 @@
+import os
+
+
+class AdmissionController:
+    """
+    Global concurrency limit that favours interactive /predict over batch work
+    Batch requests may only use the slots left after `reserved_interactive`,
+    so a bulk client can never take every worker slot
+    max_concurrency defaults to twice `cpus`, the CPUs this worker may use
+    """
+
+    def __init__(self, max_concurrency=None, reserved_interactive=None, cpus=None):
+        self.max_concurrency = max_concurrency or (cpus or os.cpu_count() or 1) * 2
+        if reserved_interactive is None:
+            reserved_interactive = max(1, self.max_concurrency // 4)
+        self.batch_limit = max(1, self.max_concurrency - reserved_interactive)
+        self.in_flight = 0
+        self.batch_in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def try_acquire(self, batch=False):
+        """
+        Take a slot without waiting; return False when the service is full
+        """
+        if self.in_flight >= self.max_concurrency or (batch and self.batch_in_flight >= self.batch_limit):
+            self.rejected += 1
+            return False
+
+        self.in_flight += 1
+        if batch:
+            self.batch_in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self, batch=False):
+        self.in_flight -= 1
+        if batch:
+            self.batch_in_flight -= 1
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "batch_limit": self.batch_limit,
+            "in_flight": self.in_flight,
+            "batch_in_flight": self.batch_in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def admission_from_env(cpus=None):
+    """
+    Build the controller from ADMISSION_* environment variables; `cpus` sizes
+    the default limit (os.cpu_count() when not given)
+    """
+    max_concurrency = os.getenv("ADMISSION_MAX_CONCURRENCY")
+    reserved = os.getenv("ADMISSION_RESERVED_INTERACTIVE")
+    return AdmissionController(
+        max_concurrency=int(max_concurrency) if max_concurrency else None,
+        reserved_interactive=int(reserved) if reserved else None,
+        cpus=cpus
+    )
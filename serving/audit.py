@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+OVERFLOW_POLICIES = ("reject", "drop_oldest", "drop")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    endpoint TEXT,
+    model_version TEXT,
+    inference_mode TEXT,
+    price REAL,
+    latency_ms REAL,
+    inputs TEXT,
+    features TEXT
+);
+CREATE INDEX IF NOT EXISTS predictions_created_at ON predictions (created_at);
+"""
+
+COLUMNS = ("created_at", "endpoint", "model_version", "inference_mode", "price", "latency_ms", "inputs", "features")
+
+
+class AuditLog:
+    """
+    Write-behind log of every served prediction in a local SQLite file
+
+    record() only appends to a bounded in-memory queue; a background thread
+    inserts the queued records in one transaction per batch. When the queue
+    is full the overflow policy decides:
+    - reject: record() returns False and the caller fails the request, so no
+      prediction is served without being logged
+    - drop_oldest: the oldest queued records make room for the new ones
+    - drop: the new records are discarded
+    """
+
+    def __init__(self, path, max_queue=10000, batch_size=500, flush_interval=1.0, overflow="reject"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed = 0
+        self.last_error = None
+
+        # The writer thread owns this connection; timeout covers other workers' commits
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, entries):
+        """
+        Queue a list of records (dicts with COLUMNS; inputs and features are
+        serialized by the writer); False when rejected by the overflow policy
+        """
+        with self._lock:
+            overflow = len(self._queue) + len(entries) - self.max_queue
+            if overflow > 0:
+                if self.overflow == "reject":
+                    self.rejected += len(entries)
+                    return False
+                if self.overflow == "drop":
+                    self.dropped += len(entries)
+                    return True
+                for _ in range(min(overflow, len(self._queue))):
+                    self._queue.popleft()
+                self.dropped += overflow
+                entries = entries[-self.max_queue:]
+            self._queue.extend(entries)
+            self.recorded += len(entries)
+            full_batch = len(self._queue) >= self.batch_size
+        if full_batch:
+            self._wake.set()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return
+            rows = [(entry["created_at"], entry["endpoint"], entry["model_version"], entry["inference_mode"],
+                     entry["price"], entry["latency_ms"], json.dumps(entry["inputs"], separators=(",", ":")),
+                     json.dumps([float(value) for value in entry["features"]]))
+                    for entry in batch]
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        f"INSERT INTO predictions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                        rows
+                    )
+                self.written += len(batch)
+            except sqlite3.Error as e:
+                self.failed += len(batch)
+                self.last_error = str(e)
+                print(f"Warning: audit batch of {len(batch)} records lost: {e}")
+
+    def close(self):
+        """
+        Write what is still queued, stop the writer thread and close the file
+        """
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=30)
+        self._conn.close()
+
+    def recent(self, limit=50, since=None, model_version=None, endpoint=None):
+        """
+        Most recent written records, newest first (blocking; reads its own connection)
+        """
+        query = f"SELECT id, {', '.join(COLUMNS)} FROM predictions"
+        conditions, parameters = [], []
+        for condition, value in (("created_at >= ?", since), ("model_version = ?", model_version),
+                                 ("endpoint = ?", endpoint)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC LIMIT ?"
+        parameters.append(limit)
+
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5.0)
+        try:
+            rows = conn.execute(query, parameters).fetchall()
+        finally:
+            conn.close()
+        records = []
+        for row in rows:
+            record = dict(zip(("id",) + COLUMNS, row))
+            record["inputs"] = json.loads(record["inputs"])
+            record["features"] = json.loads(record["features"])
+            records.append(record)
+        return records
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "overflow": self.overflow,
+            "recorded": self.recorded,
+            "written": self.written,
+            "queued": len(self._queue),
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+
+def audit_record(endpoint, model_version, inference_mode, price, latency_ms, inputs, features):
+    return {
+        "created_at": time.time(),
+        "endpoint": endpoint,
+        "model_version": model_version,
+        "inference_mode": inference_mode,
+        "price": price,
+        "latency_ms": latency_ms,
+        "inputs": inputs,
+        "features": features,
+    }
+
+
+def audit_log_from_env():
+    """
+    Build the audit log from AUDIT_* environment variables; None when auditing is off
+    """
+    path = os.getenv("AUDIT_DB_PATH")
+    if not path:
+        return None
+    return AuditLog(
+        path,
+        max_queue=int(os.getenv("AUDIT_QUEUE", "10000")),
+        batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+        flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0")),
+        overflow=os.getenv("AUDIT_OVERFLOW", "reject"),
+    )
@@ -0,0 +1,193 @@
+import json
+import math
+import os
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+# Native thread pools read these when their library loads; BLAS_NUM_THREADS fills the BLAS ones
+OPENMP_VARIABLE = "OMP_NUM_THREADS"
+BLAS_VARIABLES = ("OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "BLIS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+# (variable, attribute, type, description); values come from the environment,
+# then from the CONFIG_FILE JSON object keyed by the same names, then defaults
+SETTINGS = (
+    ("MODEL_PATH", "model_path", str, "Model artifact; unset probes the usual locations"),
+    ("GEO_DATA_PATH", "geo_data_path", str, "Postal code coordinates CSV; unset probes the usual locations"),
+    ("LISTINGS_PATH", "listings_path", str, "Listings CSV behind the market statistics"),
+    ("COMPARABLES_INDEX_PATH", "comparables_index_path", str, "Comparables index built by market/comparables.py"),
+    ("DRIFT_BASELINE_PATH", "drift_baseline_path", str, "Training feature distributions for the drift monitor"),
+    ("WEB_CONCURRENCY", "workers", int, "uvicorn worker processes"),
+    ("THREADPOOL_SIZE", "threadpool_size", int, "Threads running blocking preprocessing and prediction, per worker"),
+    ("XGBOOST_NTHREAD", "xgboost_nthread", int, "Threads of one XGBoost prediction"),
+    ("OMP_NUM_THREADS", "omp_threads", int, "OpenMP threads per pool (XGBoost, scikit-learn)"),
+    ("BLAS_NUM_THREADS", "blas_threads", int, "OpenBLAS / MKL threads used by numpy"),
+    ("EXPLAIN_CACHE_SIZE", "explain_cache_size", int, "Feature vectors kept by the explanation cache"),
+    ("PROFILE_STORE_SIZE", "profile_store_size", int, "Profiles kept in memory for /admin/profiles"),
+    ("MAX_BATCH_SIZE", "max_batch_size", int, "Largest accepted batch"),
+    ("MARKET_REFRESH_SECONDS", "market_refresh_seconds", float, "Seconds between reads of rows appended to the listings"),
+    ("DRIFT_WINDOW", "drift_window", int, "Predictions per drift monitor window"),
+    ("GET_PREDICT_MAX_AGE", "get_predict_max_age", int, "Seconds HTTP caches may reuse a GET /predict response"),
+)
+
+DEFAULTS = {
+    "LISTINGS_PATH": "data/listings.csv",
+    "COMPARABLES_INDEX_PATH": "model/comparables.joblib",
+    "DRIFT_BASELINE_PATH": "model/drift_baseline.json",
+    "WEB_CONCURRENCY": 1,
+    "EXPLAIN_CACHE_SIZE": 4096,
+    "PROFILE_STORE_SIZE": 50,
+    "MAX_BATCH_SIZE": 1000,
+    "MARKET_REFRESH_SECONDS": 60.0,
+    "DRIFT_WINDOW": 10000,
+    "GET_PREDICT_MAX_AGE": 3600,
+}
+
+
+def cgroup_cpu_quota():
+    """
+    CPUs granted by the cgroup CPU quota (v2, then v1), or None when unlimited
+    """
+    try:
+        with open(CGROUP_V2_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(CGROUP_V1_QUOTA) as f:
+            quota = int(f.read())
+        with open(CGROUP_V1_PERIOD) as f:
+            period = int(f.read())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus():
+    """
+    (cpus, source): CPUs this process may actually use, the smaller of its
+    affinity mask and the cgroup quota rounded up; os.cpu_count() reports the
+    whole host, which is what oversubscribes containers on shared machines
+    """
+    try:
+        cpus, source = len(os.sched_getaffinity(0)), "affinity"
+    except AttributeError:
+        cpus, source = os.cpu_count() or 1, "cpu_count"
+    quota = cgroup_cpu_quota()
+    if quota is not None and math.ceil(quota) < cpus:
+        cpus, source = max(1, math.ceil(quota)), "cgroup_quota"
+    return cpus, source
+
+
+class Settings:
+    """
+    Runtime configuration of the API, resolved once at import time
+
+    Thread counts not given explicitly are derived from the CPUs left to each
+    worker, so the executor, XGBoost and the native pools together stay close
+    to one busy thread per CPU. By default every prediction runs XGBoost on a
+    single thread: concurrency comes from the executor, and a pool of
+    XGBoost threads per executor thread would multiply instead of add up.
+    """
+
+    def __init__(self, values, sources, cpus, cpu_source, config_file=None):
+        self.values = values
+        self.sources = sources
+        self.cpus = cpus
+        self.cpu_source = cpu_source
+        self.config_file = config_file
+        for variable, attribute, _, _ in SETTINGS:
+            setattr(self, attribute, values[variable])
+
+    @property
+    def cpus_per_worker(self):
+        return max(1, self.cpus // max(1, self.workers))
+
+    def apply_thread_environment(self):
+        """
+        Export the thread limits for native libraries that are not loaded yet;
+        BLAS variables set explicitly in the environment are left alone
+        """
+        os.environ[OPENMP_VARIABLE] = str(self.omp_threads)
+        for variable in BLAS_VARIABLES:
+            os.environ.setdefault(variable, str(self.blas_threads))
+
+    def limit_loaded_thread_pools(self):
+        """
+        Resize the OpenMP and BLAS pools of libraries already loaded (a no-op
+        without threadpoolctl); returns the pools found, for /config
+        """
+        try:
+            from threadpoolctl import threadpool_info, threadpool_limits
+        except ImportError:
+            return None
+        threadpool_limits(limits=self.omp_threads, user_api="openmp")
+        threadpool_limits(limits=self.blas_threads, user_api="blas")
+        return [{"library": pool["internal_api"], "user_api": pool["user_api"], "num_threads": pool["num_threads"]}
+                for pool in threadpool_info()]
+
+    def as_dict(self):
+        settings = {}
+        for variable, attribute, _, description in SETTINGS:
+            settings[attribute] = {
+                "value": self.values[variable],
+                "source": self.sources[variable],
+                "env": variable,
+                "description": description,
+            }
+        return {
+            "cpus": {"available": self.cpus, "source": self.cpu_source, "per_worker": self.cpus_per_worker},
+            "config_file": self.config_file,
+            "settings": settings,
+        }
+
+
+def read_config_file(path):
+    with open(path) as f:
+        values = json.load(f)
+    if not isinstance(values, dict):
+        raise ValueError(f"Config file {path} must hold a JSON object")
+    unknown = set(values) - {variable for variable, _, _, _ in SETTINGS}
+    if unknown:
+        raise ValueError(f"Unknown settings in {path}: {', '.join(sorted(unknown))}")
+    return values
+
+
+def load_settings(environ=None, cpus=None):
+    """
+    Resolve every setting from the environment, the optional CONFIG_FILE and
+    the CPUs available to the process
+    """
+    environ = os.environ if environ is None else environ
+    config_file = environ.get("CONFIG_FILE")
+    file_values = read_config_file(config_file) if config_file else {}
+    cpu_source = "given"
+    if cpus is None:
+        cpus, cpu_source = available_cpus()
+
+    values, sources = {}, {}
+    for variable, _, kind, _ in SETTINGS:
+        if environ.get(variable):
+            values[variable], sources[variable] = kind(environ[variable]), "env"
+        elif file_values.get(variable) is not None:
+            values[variable], sources[variable] = kind(file_values[variable]), "file"
+        else:
+            values[variable], sources[variable] = DEFAULTS.get(variable), "default"
+
+    # CPU-derived defaults, each building on the ones above it
+    per_worker = max(1, cpus // max(1, values["WEB_CONCURRENCY"]))
+    derived = {
+        # Requests spend part of their time holding the GIL in pandas and
+        # Python code, so two threads per CPU keep the cores busy
+        "THREADPOOL_SIZE": lambda: max(4, 2 * per_worker),
+        "XGBOOST_NTHREAD": lambda: max(1, per_worker // values["THREADPOOL_SIZE"]),
+        "OMP_NUM_THREADS": lambda: values["XGBOOST_NTHREAD"],
+        "BLAS_NUM_THREADS": lambda: 1,
+    }
+    for variable, default in derived.items():
+        # 0 also asks for the derived value
+        if not values[variable]:
+            values[variable], sources[variable] = default(), "cpus"
+    return Settings(values, sources, cpus, cpu_source, config_file)
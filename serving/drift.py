@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+BASELINE_VERSION = 1
+DEFAULT_BINS = 10
+# Features with at most this many distinct training values get one bin per value
+MAX_CATEGORIES = 32
+# Floor for empty bins, so an unseen value gives a large but finite score
+EPSILON = 1e-4
+# Population stability index: < 0.1 stable, < 0.25 moderate shift, above that drift
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+
+
+def feature_bins(values, bins=DEFAULT_BINS):
+    """
+    Bin edges and kind for one training column; value v falls in bin
+    searchsorted(edges, v, side="right")
+    """
+    values = values[~np.isnan(values)]
+    distinct = np.unique(values)
+    if len(distinct) <= MAX_CATEGORIES:
+        # Codes and flags: a narrow bin around every training value, so values
+        # never seen in training land in the bins between them
+        half_width = np.diff(distinct).min() / 4 if len(distinct) > 1 else 0.5
+        return np.ravel(np.column_stack([distinct - half_width, distinct + half_width])), "categorical"
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+    return edges, "numeric"
+
+
+def build_baseline(frame, bins=DEFAULT_BINS):
+    """
+    Training distribution of every encoded feature of `frame`, for DriftMonitor
+    """
+    features = {}
+    for column in frame.columns:
+        values = frame[column].to_numpy(dtype=np.float64)
+        edges, kind = feature_bins(values, bins)
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        features[column] = {
+            "kind": kind,
+            "edges": [float(edge) for edge in edges],
+            "expected": [float(share) for share in counts / max(counts.sum(), 1)],
+        }
+    return {
+        "version": BASELINE_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "rows": len(frame),
+        "features": features,
+    }
+
+
+def save_baseline(baseline, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(baseline, f)
+    os.replace(tmp_path, path)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Unsupported drift baseline version {baseline.get('version')}")
+    return baseline
+
+
+class DriftMonitor:
+    """
+    Compares live encoded feature vectors with the training baseline
+
+    Each feature keeps one counter per baseline bin, for the current window
+    and the one before it, so memory does not grow with traffic and an
+    update is a single comparison of the vector against all bin edges.
+    Scores cover the last one to two windows of predictions.
+    """
+
+    def __init__(self, baseline, columns, window=10000, min_samples=500):
+        self.names = [column for column in columns if column in baseline["features"]]
+        self.kinds = [baseline["features"][name]["kind"] for name in self.names]
+        self.index = np.array([columns.index(name) for name in self.names], dtype=np.intp)
+        self.baseline_rows = baseline["rows"]
+        self.window = window
+        self.min_samples = min_samples
+
+        specs = [baseline["features"][name] for name in self.names]
+        width = max((len(spec["edges"]) for spec in specs), default=0)
+        # Edges padded with +inf and expected shares with 0: padding bins never fill
+        self.edges = np.full((len(specs), width), np.inf)
+        self.expected = np.zeros((len(specs), width + 1))
+        for i, spec in enumerate(specs):
+            self.edges[i, :len(spec["edges"])] = spec["edges"]
+            self.expected[i, :len(spec["expected"])] = spec["expected"]
+
+        self._features = np.arange(len(self.names))
+        self._current = np.zeros((len(self.names), width + 1), dtype=np.int64)
+        self._previous = np.zeros_like(self._current)
+        self._in_window = 0
+        self.observed = 0
+        self._lock = threading.Lock()
+
+    def observe(self, row):
+        """
+        Count one encoded feature vector
+        """
+        bins = (row[self.index, None] >= self.edges).sum(axis=1)
+        with self._lock:
+            self._current[self._features, bins] += 1
+            self._advance(1)
+
+    def observe_many(self, matrix):
+        """
+        Count the rows of an encoded feature matrix
+        """
+        matrix = np.asarray(matrix)
+        if not len(matrix):
+            return
+        counts = np.zeros_like(self._current)
+        for i, column in enumerate(self.index):
+            bins = np.searchsorted(self.edges[i], matrix[:, column], side="right")
+            counts[i] = np.bincount(bins, minlength=counts.shape[1])
+        with self._lock:
+            self._current += counts
+            self._advance(len(matrix))
+
+    def _advance(self, rows):
+        self.observed += rows
+        self._in_window += rows
+        if self._in_window >= self.window:
+            self._previous, self._current = self._current, self._previous
+            self._current[:] = 0
+            self._in_window = 0
+
+    def scores(self, details=False):
+        """
+        Population stability index of every feature against the baseline
+        """
+        with self._lock:
+            counts = self._current + self._previous
+        samples = int(counts[0].sum()) if len(counts) else 0
+        if samples:
+            observed = counts / samples
+            psi = ((observed - self.expected) * np.log((observed + EPSILON) / (self.expected + EPSILON))).sum(axis=1)
+        else:
+            observed = counts.astype(np.float64)
+            psi = np.zeros(len(self.names))
+
+        features = {}
+        for i, name in enumerate(self.names):
+            entry = {"kind": self.kinds[i], "psi": round(float(psi[i]), 5), "status": self.status(psi[i], samples)}
+            if details:
+                n_bins = int(np.isfinite(self.edges[i]).sum()) + 1
+                entry["edges"] = self.edges[i, :n_bins - 1].tolist()
+                entry["expected"] = np.round(self.expected[i, :n_bins], 5).tolist()
+                entry["observed"] = np.round(observed[i, :n_bins], 5).tolist()
+            features[name] = entry
+
+        ranked = sorted(features, key=lambda name: features[name]["psi"], reverse=True)
+        return {
+            "samples": samples,
+            "observed_total": self.observed,
+            "window": self.window,
+            "baseline_rows": self.baseline_rows,
+            "drifted": [name for name in ranked if features[name]["status"] == "drift"],
+            "max_psi": features[ranked[0]]["psi"] if ranked else 0.0,
+            "features": features,
+        }
+
+    def status(self, psi, samples):
+        if samples < self.min_samples:
+            return "insufficient_data"
+        if psi < PSI_MODERATE:
+            return "stable"
+        if psi < PSI_DRIFT:
+            return "moderate"
+        return "drift"
@@ -0,0 +1,96 @@
+import os
+
+# Fewest in-flight requests the default queue trigger fires above; on small
+# hosts a fraction of the admission limit would degrade the second concurrent
+# request, so overload there is left to the latency trigger
+MIN_QUEUE_THRESHOLD = 4
+
+
+class LoadShedder:
+    """
+    Decide when to answer with a truncated tree ensemble instead of the full model
+    Fast mode turns on when too many requests are in flight or the smoothed
+    latency passes a threshold, and turns off once latency has recovered
+    """
+
+    def __init__(self, queue_threshold=None, latency_threshold_ms=250.0,
+                 fast_rounds=None, fast_fraction=0.25, alpha=0.2, recovery=0.7):
+        self.queue_threshold = queue_threshold
+        self.latency_threshold_ms = latency_threshold_ms
+        self.fast_rounds = fast_rounds
+        self.fast_fraction = fast_fraction
+        self.alpha = alpha
+        self.recovery = recovery
+        self.total_rounds = None
+        self.latency_ewma_ms = 0.0
+        self.overloaded = False
+        self.full_requests = 0
+        self.fast_requests = 0
+
+    def configure(self, model, max_concurrency):
+        """
+        Size fast mode against the loaded model and the admission limit
+        """
+        if self.queue_threshold is None:
+            self.queue_threshold = max(MIN_QUEUE_THRESHOLD, int(max_concurrency * 0.75))
+        try:
+            self.total_rounds = model.get_booster().num_boosted_rounds()
+        except Exception as e:
+            print(f"Warning: fast mode disabled, could not count boosting rounds: {e}")
+            self.total_rounds = None
+            return
+        if self.fast_rounds is None:
+            self.fast_rounds = max(1, int(self.total_rounds * self.fast_fraction))
+        self.fast_rounds = min(self.fast_rounds, self.total_rounds)
+
+    def observe(self, latency_ms):
+        """
+        Fold the latency of a finished prediction into the moving average
+        """
+        self.latency_ewma_ms = self.alpha * latency_ms + (1 - self.alpha) * self.latency_ewma_ms
+        if self.latency_ewma_ms > self.latency_threshold_ms:
+            self.overloaded = True
+        elif self.latency_ewma_ms < self.latency_threshold_ms * self.recovery:
+            self.overloaded = False
+
+    def choose(self, in_flight, requested_fast=False):
+        """
+        Return (mode, iteration_range) for the next prediction
+        """
+        if self.total_rounds is None or self.fast_rounds >= self.total_rounds:
+            self.full_requests += 1
+            return "full", None
+
+        queue_full = self.queue_threshold is not None and in_flight > self.queue_threshold
+        if requested_fast or queue_full or self.overloaded:
+            self.fast_requests += 1
+            return "fast", (0, self.fast_rounds)
+
+        self.full_requests += 1
+        return "full", None
+
+    def stats(self):
+        return {
+            "overloaded": self.overloaded,
+            "latency_ewma_ms": round(self.latency_ewma_ms, 2),
+            "latency_threshold_ms": self.latency_threshold_ms,
+            "queue_threshold": self.queue_threshold,
+            "fast_rounds": self.fast_rounds,
+            "total_rounds": self.total_rounds,
+            "full_requests": self.full_requests,
+            "fast_requests": self.fast_requests,
+        }
+
+
+def load_shedder_from_env():
+    """
+    Build the shedder from FAST_MODE_* environment variables
+    """
+    queue_threshold = os.getenv("FAST_MODE_QUEUE_DEPTH")
+    fast_rounds = os.getenv("FAST_MODE_ROUNDS")
+    return LoadShedder(
+        queue_threshold=int(queue_threshold) if queue_threshold else None,
+        latency_threshold_ms=float(os.getenv("FAST_MODE_LATENCY_MS", "250")),
+        fast_rounds=int(fast_rounds) if fast_rounds else None,
+        fast_fraction=float(os.getenv("FAST_MODE_FRACTION", "0.25"))
+    )
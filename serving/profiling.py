@@ -0,0 +1,142 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+
+class ProfileSession:
+    """
+    Runs the stages of one request under a single cProfile profiler
+    Stages may run in different threads (worker pool, event loop), one at a time
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.stages_ms = OrderedDict()
+
+    def stage(self, name, func, *args, **kwargs):
+        started = time.perf_counter()
+        self.profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.profiler.disable()
+            self.stages_ms[name] = round((time.perf_counter() - started) * 1000, 3)
+
+    def report(self, top=40):
+        """
+        Stage timings plus the functions with the highest cumulative time
+        """
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        functions = []
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            functions.append({
+                "function": name,
+                "location": f"{short_path(filename)}:{line}",
+                "calls": ncalls,
+                "self_ms": round(tottime * 1000, 3),
+                "cumulative_ms": round(cumtime * 1000, 3),
+            })
+        functions.sort(key=lambda f: f["cumulative_ms"], reverse=True)
+        return {
+            "created_at": datetime.now().isoformat(),
+            "total_ms": round(sum(self.stages_ms.values()), 3),
+            "stages_ms": dict(self.stages_ms),
+            "functions": functions[:top],
+        }
+
+
+class ProfileStore:
+    """
+    Recent request profiles, by id; with a directory, the raw cProfile
+    data is also dumped there as <id>.pstats (for snakeviz, pstats, ...)
+    """
+
+    def __init__(self, max_entries=50, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session, top=40, **details):
+        profile_id = uuid.uuid4().hex[:16]
+        report = {"id": profile_id, **details, **session.report(top)}
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            session.profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.pstats"))
+        with self._lock:
+            self._profiles[profile_id] = report
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [{"id": p["id"], "created_at": p["created_at"], "total_ms": p["total_ms"], "path": p.get("path")}
+                    for p in reversed(self._profiles.values())]
+
+
+def sample_stacks(duration, interval=0.005, max_depth=64):
+    """
+    Sample the Python stacks of every other thread of this process for
+    `duration` seconds; returns per-function self/total sample counts and
+    the stacks in collapsed form ("outer;...;inner" -> samples), the input
+    format of flame graph tools
+    """
+    own_thread = threading.get_ident()
+    stacks = Counter()
+    samples = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            names = []
+            while frame is not None and len(names) < max_depth:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({short_path(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            stacks[";".join(reversed(names))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    self_counts, total_counts = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_counts[strip_line(frames[-1])] += count
+        for name in set(strip_line(f) for f in frames):
+            total_counts[name] += count
+    return {
+        "duration_s": duration,
+        "interval_ms": interval * 1000,
+        "samples": samples,
+        "functions": [{"function": name, "self": self_counts[name], "total": total}
+                      for name, total in total_counts.most_common(50)],
+        "stacks": dict(stacks.most_common()),
+    }
+
+
+def strip_line(frame_name):
+    """'func (file.py:12)' -> 'func (file.py)', so samples of one function add up"""
+    return frame_name.rsplit(":", 1)[0] + ")" if ":" in frame_name else frame_name
+
+
+def short_path(filename):
+    """Path relative to the project or to site-packages, to keep reports short"""
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if filename.startswith(root):
+        return os.path.relpath(filename, root)
+    return os.path.basename(filename)
@@ -0,0 +1,246 @@
+import hashlib
+import ipaddress
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+
+class MemoryBucketStore:
+    """
+    Per-process token buckets kept in a dict, least recently used first
+    Past max_clients, refilled buckets are dropped, then the least recently
+    used ones, so the store stays bounded whatever keys clients present
+    """
+
+    clock = staticmethod(time.monotonic)
+    # take() never waits, so it can run on the event loop
+    blocking = False
+
+    def __init__(self, max_clients=10000):
+        self.max_clients = max_clients
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, client, cost, rate, capacity, now):
+        with self._lock:
+            # Popped and re-inserted, so the dict stays ordered by last use
+            tokens, updated = self._buckets.pop(client, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[client] = (tokens, now)
+
+            if len(self._buckets) > self.max_clients:
+                self._prune(rate, capacity, now)
+
+            return allowed, tokens
+
+    def _prune(self, rate, capacity, now):
+        # Buckets that have refilled completely carry no state worth keeping
+        idle = [
+            client for client, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * rate >= capacity
+        ]
+        for client in idle:
+            del self._buckets[client]
+        # Still full: evict the least recently used, with some headroom so
+        # that the next requests do not scan the whole store again
+        excess = len(self._buckets) - int(self.max_clients * 0.9)
+        for client in list(itertools.islice(self._buckets, max(0, excess))):
+            del self._buckets[client]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """
+    Token buckets in a local SQLite file, shared by all workers on the host
+    take() may wait for other workers' write locks, so callers run it off the
+    event loop; when the database stays busy or fails, requests are let
+    through (fail open) rather than answered with errors
+    """
+
+    # Wall clock, since timestamps are compared across processes
+    clock = staticmethod(time.time)
+    blocking = True
+    # Seconds between deletions of rows whose bucket has refilled completely
+    prune_interval = 60.0
+    # Seconds between two warnings about a failing database
+    warn_interval = 60.0
+
+    def __init__(self, path, timeout=1.0):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (client TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+        )
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+        self._warned_at = 0.0
+        self.errors = 0
+        self.pruned = 0
+
+    def take(self, client, cost, rate, capacity, now):
+        with self._lock:
+            try:
+                return self._take(client, cost, rate, capacity, now)
+            except sqlite3.Error as e:
+                self.errors += 1
+                if now - self._warned_at >= self.warn_interval:
+                    self._warned_at = now
+                    print(f"Warning: rate limit store {self.path} unavailable, letting requests through: {e}")
+                return True, capacity
+
+    def _take(self, client, cost, rate, capacity, now):
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            row = cursor.execute(
+                "SELECT tokens, updated FROM buckets WHERE client = ?", (client,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cursor.execute(
+                "INSERT OR REPLACE INTO buckets (client, tokens, updated) VALUES (?, ?, ?)",
+                (client, tokens, now)
+            )
+            if rate > 0 and now - self._pruned_at >= self.prune_interval:
+                # A bucket untouched for capacity / rate seconds is full again: same as no row
+                self.pruned += cursor.execute(
+                    "DELETE FROM buckets WHERE updated < ?", (now - capacity / rate,)
+                ).rowcount
+                self._pruned_at = now
+            cursor.execute("COMMIT")
+        except Exception:
+            if self._conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        return allowed, tokens
+
+    def __len__(self):
+        # Own connection: in WAL mode a reader never waits for the writers
+        conn = sqlite3.connect(self.path, timeout=0.1)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM buckets").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+        finally:
+            conn.close()
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter keyed by API key or client IP
+    Each request takes `cost` tokens (1 for /predict, the row count for batches)
+    """
+
+    def __init__(self, rate_per_minute=120, burst=60, store=None, trusted_proxies=(), api_keys=()):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self.store = store if store is not None else MemoryBucketStore()
+        self.trusted_proxies = [ipaddress.ip_network(proxy, strict=False) for proxy in trusted_proxies]
+        self.api_keys = frozenset(api_keys)
+        self.allowed = 0
+        self.rejected = 0
+
+    def identify(self, request):
+        """
+        Bucket key for a request, see client_identity()
+        """
+        return client_identity(request, self.trusted_proxies, self.api_keys)
+
+    def check(self, client, cost=1):
+        """
+        Take `cost` tokens for client; return (allowed, retry_after_seconds)
+        """
+        if cost > self.capacity:
+            # Can never succeed, no point in making the client retry
+            self.rejected += 1
+            return False, None
+
+        allowed, tokens = self.store.take(client, cost, self.rate, self.capacity, self.store.clock())
+        if allowed:
+            self.allowed += 1
+            return True, 0.0
+
+        self.rejected += 1
+        return False, (cost - tokens) / self.rate if self.rate > 0 else None
+
+    def stats(self):
+        return {
+            "rate_per_minute": round(self.rate * 60, 2),
+            "burst": self.capacity,
+            "backend": type(self.store).__name__,
+            "clients": len(self.store),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "store_errors": getattr(self.store, "errors", 0),
+        }
+
+
+def is_trusted(address, trusted_proxies):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def client_identity(request, trusted_proxies=(), api_keys=frozenset()):
+    """
+    Bucket key for a request: a known API key, otherwise the client address
+    Headers are client-controlled, so an X-API-Key only counts when it is one
+    of api_keys, and X-Forwarded-For only when the connection comes from a
+    trusted proxy; the client is then the last address that is not a proxy
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in api_keys:
+        # Hashed, so keys are not kept in the bucket store
+        return f"key:{hashlib.sha256(api_key.encode()).hexdigest()[:16]}"
+
+    address = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and is_trusted(address, trusted_proxies):
+        # Each proxy appends the address it received the request from
+        for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+            address = hop
+            if not is_trusted(hop, trusted_proxies):
+                break
+    return f"ip:{address}"
+
+
+def split_list(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def rate_limiter_from_env():
+    """
+    Build the limiter from RATE_LIMIT_* environment variables
+    RATE_LIMIT_BACKEND=sqlite shares buckets between workers through RATE_LIMIT_DB
+    RATE_LIMIT_TRUSTED_PROXIES (addresses or CIDRs) and RATE_LIMIT_API_KEYS are
+    comma-separated lists
+    """
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        store = SQLiteBucketStore(os.getenv("RATE_LIMIT_DB", "/tmp/immo_ratelimit.sqlite"))
+    else:
+        store = MemoryBucketStore()
+
+    return RateLimiter(
+        rate_per_minute=float(os.getenv("RATE_LIMIT_PER_MINUTE", "600")),
+        burst=float(os.getenv("RATE_LIMIT_BURST", "1000")),
+        store=store,
+        trusted_proxies=split_list(os.getenv("RATE_LIMIT_TRUSTED_PROXIES")),
+        api_keys=split_list(os.getenv("RATE_LIMIT_API_KEYS"))
+    )
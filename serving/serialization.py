@@ -0,0 +1,69 @@
+import gzip
+
+import orjson
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Level 1 halves the time of the default level; JSON bodies come out only ~3% larger
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 3
+# Smaller bodies are sent as they are: compressing them saves less than it costs
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps(content):
+    """
+    Compact JSON bytes; numpy scalars and arrays are serialized natively
+    """
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def supported_encodings():
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding):
+    """
+    Content encoding to use for an Accept-Encoding header, or None; zstd is
+    preferred when both are accepted and the zstandard package is installed
+    """
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    for encoding in supported_encodings():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "zstd":
+        # One compressor per call: instances must not be shared between threads
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+
+def decompress(body, encoding):
+    """
+    Body as sent before `encoding` was applied (identity when encoding is None)
+    """
+    if not encoding or encoding == "identity":
+        return body
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
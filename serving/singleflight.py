@@ -0,0 +1,60 @@
+import asyncio
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical computations into one shared execution
+    Callers using the same key while a computation is running wait on its result
+    instead of starting their own
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key, func, *args):
+        """
+        Run func(*args) in the thread pool, or join the running call for key
+        """
+        self.requests += 1
+        task = self._in_flight.get(key)
+
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(run_in_threadpool(func, *args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+
+        # Shield so that one cancelled caller (client disconnect) does not
+        # cancel the computation the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def running(self, key):
+        """
+        Whether a call for key is in progress, i.e. run() would join it
+        """
+        return key in self._in_flight
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        """
+        Counters describing how much work was saved by coalescing
+        """
+        return {
+            "requests": self.requests,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(self.coalesced / self.requests, 4) if self.requests else 0.0,
+        }
@@ -0,0 +1,270 @@
+import contextlib
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+
+# W3C trace context: version-traceid-parentid-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# (trace, span id) of the innermost open span; None outside sampled requests
+_current = ContextVar("current_span", default=None)
+
+
+def new_trace_id():
+    return os.urandom(16).hex()
+
+
+def new_span_id():
+    return os.urandom(8).hex()
+
+
+class Trace:
+    """
+    The spans of one sampled request, exported together when its root span ends
+    Spans can be added from any thread
+    """
+
+    def __init__(self, trace_id, parent_id=None):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.spans = []
+
+    def add(self, name, span_id, parent_id, start_ns, end_ns, attributes=None):
+        self.spans.append({
+            "trace_id": self.trace_id,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start_us": start_ns // 1000,
+            "duration_us": (end_ns - start_ns) // 1000,
+            "attributes": attributes or {},
+        })
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Record a child span of the current one; does nothing outside a sampled request
+    Yields the attributes dict, so values known at the end can still be added
+    """
+    current = _current.get()
+    if current is None:
+        yield attributes
+        return
+    trace, parent_id = current
+    span_id = new_span_id()
+    token = _current.set((trace, span_id))
+    start = time.time_ns()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        trace.add(name, span_id, parent_id, start, time.time_ns(), attributes)
+
+
+def queued(func, name="executor.queue"):
+    """
+    Wrap func, about to be handed to the thread pool, so that the time it
+    waits for a worker thread is recorded as a span
+    """
+    current = _current.get()
+    if current is None:
+        return func
+    trace, parent_id = current
+    submitted = time.time_ns()
+
+    def run(*args, **kwargs):
+        trace.add(name, new_span_id(), parent_id, submitted, time.time_ns())
+        return func(*args, **kwargs)
+
+    return run
+
+
+class SpanExporter:
+    """
+    Writes finished traces in batches from a background thread, as JSON
+    lines to a file or as POSTed {"spans": [...]} batches to a collector URL
+    When the queue is full traces are dropped, so export never slows requests
+    """
+
+    def __init__(self, path=None, url=None, max_queue=10000, flush_interval=1.0, batch_size=512):
+        if not path and not url:
+            raise ValueError("SpanExporter needs a path or a url")
+        self.path = path.replace("{pid}", str(os.getpid())) if path else None
+        self.url = url
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans):
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.extend(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            try:
+                self._write(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"Warning: span export failed: {e}")
+
+    def _write(self, batch):
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(s, separators=(",", ":")) + "\n" for s in batch))
+        if self.url:
+            body = json.dumps({"spans": batch}, separators=(",", ":")).encode()
+            request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(request, timeout=5).close()
+
+    def close(self):
+        """
+        Export what is still queued and stop the writer thread
+        """
+        self._stop.set()
+        self._thread.join(timeout=10)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "url": self.url,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+        }
+
+
+class Tracer:
+    """
+    Head-based sampling: the decision is taken once when a request arrives
+    A sampled flag in an incoming traceparent header is honoured, so traces
+    started upstream stay complete; other requests are sampled at sample_rate
+    """
+
+    def __init__(self, exporter, sample_rate=0.01):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.started = 0
+        self.sampled = 0
+
+    def start(self, headers):
+        """
+        Trace id, parent span id and sampling decision for a request's headers
+        """
+        self.started += 1
+        match = TRACEPARENT.match(headers.get("traceparent", ""))
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            sampled = bool(int(flags, 16) & 1)
+        else:
+            trace_id = headers.get("x-trace-id", "").lower()
+            if not TRACE_ID.match(trace_id):
+                trace_id = new_trace_id()
+            parent_id = None
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        if sampled:
+            self.sampled += 1
+        return trace_id, parent_id, sampled
+
+    def stats(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "requests": self.started,
+            "sampled": self.sampled,
+            "exporter": self.exporter.stats(),
+        }
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root span of every HTTP request
+    Responses carry the trace id (X-Trace-Id) and a traceparent header
+    pointing at the root span, whether or not the request was sampled
+    """
+
+    def __init__(self, app, tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {}
+        for name, value in scope["headers"]:
+            if name in (b"traceparent", b"x-trace-id"):
+                headers[name.decode()] = value.decode("latin-1").strip()
+        trace_id, parent_id, sampled = self.tracer.start(headers)
+        span_id = new_span_id()
+        response_headers = [
+            (b"x-trace-id", trace_id.encode()),
+            (b"traceparent", f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}".encode()),
+        ]
+        attributes = {"http.method": scope["method"], "http.path": scope["path"]}
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                attributes["http.status_code"] = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + response_headers}
+            await send(message)
+
+        if not sampled:
+            await self.app(scope, receive, traced_send)
+            return
+
+        trace = Trace(trace_id, parent_id)
+        token = _current.set((trace, span_id))
+        start = time.time_ns()
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            _current.reset(token)
+            trace.add(f"{scope['method']} {scope['path']}", span_id, parent_id, start, time.time_ns(), attributes)
+            self.tracer.exporter.export(trace.spans)
+
+
+def tracer_from_env():
+    """
+    Build the tracer from TRACE_* environment variables; None when tracing is off
+    """
+    path = os.getenv("TRACE_EXPORT_PATH")
+    url = os.getenv("TRACE_EXPORT_URL")
+    if not path and not url:
+        return None
+    exporter = SpanExporter(path=path, url=url, max_queue=int(os.getenv("TRACE_EXPORT_QUEUE", "10000")))
+    return Tracer(exporter, sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.01")))
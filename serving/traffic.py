@@ -0,0 +1,167 @@
+import gzip
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+try:
+    from serving.serialization import decompress
+except ImportError:
+    from serialization import decompress
+
+
+class TrafficRecorder:
+    """
+    Samples prediction requests to a gzip-compressed JSON-lines file
+    Records are queued by the request path and written by a background
+    thread in batches; when the queue is full new records are dropped, so
+    capture can never slow the service down
+    """
+
+    def __init__(self, path, sample_rate=1.0, max_queue=10000, flush_interval=1.0, batch_size=500):
+        # "{pid}" in the path gives every worker process its own file
+        self.path = path.replace("{pid}", str(os.getpid()))
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="traffic-recorder", daemon=True)
+        self._thread.start()
+
+    def sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(self, entry):
+        try:
+            self._queue.put_nowait(entry)
+            self.recorded += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            # Each flush appends one gzip member; concatenated members read back as one stream
+            data = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in batch).encode()
+            with open(self.path, "ab") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            self.written += len(batch)
+
+    def close(self):
+        """
+        Write what is still queued and stop the writer thread
+        """
+        self._stop.set()
+        self._thread.join(timeout=10)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+        }
+
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware handing sampled requests on `paths` to a TrafficRecorder
+    Unsampled requests pass straight through
+    """
+
+    def __init__(self, app, recorder, paths=("/predict", "/predict/batch")):
+        self.app = app
+        self.recorder = recorder
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or not self.recorder.sampled():
+            await self.app(scope, receive, send)
+            return
+
+        request_body, response_body = [], []
+        status = None
+        encoding = None
+        received_at = time.time()
+        started = time.perf_counter()
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.append(message.get("body", b""))
+            return message
+
+        async def capture_send(message):
+            nonlocal status, encoding
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-encoding":
+                        encoding = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            try:
+                # Compressed batch responses are recorded as the JSON they encode
+                response = decompress(b"".join(response_body), encoding)
+            except Exception:
+                response = b"".join(response_body)
+            self.recorder.record({
+                "t": round(received_at, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "body": b"".join(request_body).decode("utf-8", "replace"),
+                "status": status,
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+                "response": response.decode("utf-8", "replace"),
+            })
+
+
+def read_capture(path):
+    """
+    Yield the captured records of a file written by TrafficRecorder, in order
+    """
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def traffic_recorder_from_env():
+    """
+    Build the recorder from TRAFFIC_CAPTURE_* environment variables; None when capture is off
+    """
+    path = os.getenv("TRAFFIC_CAPTURE_PATH")
+    if not path:
+        return None
+    return TrafficRecorder(
+        path,
+        sample_rate=float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "0.1")),
+        max_queue=int(os.getenv("TRAFFIC_CAPTURE_QUEUE", "10000")),
+    )
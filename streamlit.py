@@ -1,11 +1,36 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import hashlib
 import json
+import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+# The model pipeline is only needed for the in-process backend
+try:
+    from preprocessing.preprocess import load_geo_data
+    from preprocessing.pipeline import FeaturePipeline
+    from predict.predict import predict, predict_batch, load_bundle
+    from market.market_stats import MarketStats
+    LOCAL_BACKEND_AVAILABLE = True
+except ImportError:
+    LOCAL_BACKEND_AVAILABLE = False
+
+# WebSocket client for live what-if updates
+try:
+    from websockets.sync.client import connect as ws_connect
+    from websockets.exceptions import WebSocketException
+    LIVE_UPDATES_AVAILABLE = True
+except ImportError:
+    LIVE_UPDATES_AVAILABLE = False
+
 # Page configuration
 st.set_page_config(
     page_title="Belgian Real Estate Price Predictor",
@@ -21,6 +46,10 @@ if 'prediction_history' not in st.session_state:
     st.session_state.prediction_history = []
 if 'comparison_properties' not in st.session_state:
     st.session_state.comparison_properties = []
+if 'comparison_prices' not in st.session_state:
+    st.session_state.comparison_prices = {}
+if 'backend_mode' not in st.session_state:
+    st.session_state.backend_mode = os.getenv("IMMO_BACKEND_MODE", "http")
 
 # Custom CSS for better styling
 def get_theme_css(dark_mode):
@@ -174,9 +203,25 @@ def get_theme_css(dark_mode):
 st.markdown(get_theme_css(st.session_state.dark_mode), unsafe_allow_html=True)
 
 # Configuration
-API_BASE_URL = "https://immo-eliza-deployment-01ya.onrender.com"
+API_BASE_URL = os.getenv("API_BASE_URL", "https://immo-eliza-deployment-01ya.onrender.com")
+# "http" calls the API, "local" scores in-process when deployed next to the model
+BACKEND_MODES = {"http": "Remote API (HTTP)", "local": "In-process model"}
+MODEL_PATH = os.getenv("IMMO_MODEL_PATH", "model/Immo_ML.pkl")
+LISTINGS_PATH = os.getenv("LISTINGS_PATH", "data/listings.csv")
+MARKET_CACHE_TTL = 300
+LIVE_WS_URL = os.getenv(
+    "API_WS_URL",
+    API_BASE_URL.replace("https://", "wss://", 1).replace("http://", "ws://", 1) + "/ws/predict"
+)
+
+# (connect, read) timeouts in seconds; with the retries below, the slowest
+# call (POST: 3 connects, 0.5s + 1s backoff, one read) takes under 30s, the
+# circuit breaker's reset window
+HEALTH_TIMEOUT = (3.05, 5)
+PREDICT_TIMEOUT = (3.05, 20)
+HEALTH_CACHE_TTL = 15
 
-# Province price data (more comprehensive)
+# Reference province figures, used for the trend and when market statistics are unavailable
 PROVINCE_DATA = {
     "Brussels": {"avg_price": 350000, "price_per_m2": 3500, "trend": "↗️", "color": "#e74c3c"},
     "Antwerp": {"avg_price": 280000, "price_per_m2": 2800, "trend": "↗️", "color": "#3498db"},
@@ -191,38 +236,393 @@ PROVINCE_DATA = {
     "Limburg": {"avg_price": 230000, "price_per_m2": 2300, "trend": "↗️", "color": "#d35400"}
 }
 
+class CircuitBreaker:
+    """Fail fast while the API is down instead of waiting for every timeout"""
+    
+    def __init__(self, failure_threshold=3, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Closed: allow. Open: reject until reset_timeout has passed, then let one call probe"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: the next call decides whether the circuit closes again
+                self.opened_at = time.monotonic()
+                return True
+            return False
+    
+    def retry_in(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 0
+            return max(0, int(self.reset_timeout - (time.monotonic() - self.opened_at)))
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class LivePredictionChannel:
+    """Persistent WebSocket to /ws/predict that only sends the fields that changed"""
+    
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+        self.sent = {}
+        self.seq = 0
+        self.latencies_ms = deque(maxlen=50)
+    
+    def _connect(self):
+        # Messages are tiny, so per-message compression would only add latency
+        self.ws = ws_connect(self.url, open_timeout=self.timeout, compression=None)
+        self.sent = {}
+    
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+            self.ws = None
+    
+    def _exchange(self, features):
+        if self.ws is None:
+            self._connect()
+        
+        # Removed fields cannot be expressed as a delta, start over from the full state
+        reset = not self.sent or bool(set(self.sent) - set(features))
+        changed = features if reset else {k: v for k, v in features.items() if self.sent.get(k) != v}
+        
+        self.seq += 1
+        message = {"seq": self.seq, "features": changed}
+        if reset:
+            message["reset"] = True
+        self.ws.send(json.dumps(message, separators=(",", ":")))
+        self.sent = dict(features)
+        
+        # Skip replies to older updates the server may still send
+        while True:
+            reply = json.loads(self.ws.recv(timeout=self.timeout))
+            if reply.get("seq") == self.seq:
+                return reply
+    
+    def predict(self, features):
+        """Send the current features; returns (success, reply or error, round-trip ms)"""
+        started = time.perf_counter()
+        try:
+            try:
+                reply = self._exchange(features)
+            except (WebSocketException, OSError):
+                # Connection dropped (e.g. API restarted), reconnect once
+                self.close()
+                reply = self._exchange(features)
+        except (WebSocketException, OSError, TimeoutError) as e:
+            self.close()
+            return False, f"Connection Error: {str(e)}", None
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if "error" in reply:
+            return False, reply["error"], elapsed_ms
+        self.latencies_ms.append(elapsed_ms)
+        return True, reply, elapsed_ms
+
+def make_live_prediction(features):
+    """Live what-if prediction; returns (success, price or error, round-trip ms)"""
+    if st.session_state.backend_mode == "local":
+        started = time.perf_counter()
+        success, result = make_local_prediction(features)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return success, result["predicted_price"] if success else result, elapsed_ms
+    
+    if not LIVE_UPDATES_AVAILABLE:
+        return False, "Install the 'websockets' package for live updates", None
+    
+    # One connection per browser session, kept across reruns
+    if 'live_channel' not in st.session_state:
+        st.session_state.live_channel = LivePredictionChannel(LIVE_WS_URL)
+    success, result, elapsed_ms = st.session_state.live_channel.predict(features)
+    return success, result["price"] if success else result, elapsed_ms
+
 # Helper functions
+@st.cache_resource
+def get_http_session():
+    """Keep-alive session shared by all reruns, with retries and exponential backoff"""
+    session = requests.Session()
+    # Failed connects are retried for every method (nothing was sent yet).
+    # Read timeouts are not: the server may still be working, and a retry
+    # would only wait as long again. Status retries are for GET only, so a
+    # batch POST is never sent twice.
+    retry = Retry(
+        total=2,
+        connect=2,
+        read=0,
+        status=2,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET"])
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+@st.cache_resource
+def get_circuit_breaker():
+    """Circuit breaker shared by all reruns and sessions"""
+    return CircuitBreaker()
+
+def circuit_open_message():
+    return f"API unavailable, skipping calls for {get_circuit_breaker().retry_in()}s"
+
+@st.cache_data(ttl=HEALTH_CACHE_TTL, show_spinner=False)
 def check_api_health():
-    """Check if the API is healthy"""
+    """Check if the API is healthy (cached for a few seconds across reruns)"""
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        return False, circuit_open_message()
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=10)
-        return response.status_code == 200, response.json() if response.status_code == 200 else None
+        response = get_http_session().get(f"{API_BASE_URL}/health", timeout=HEALTH_TIMEOUT)
+        if response.status_code == 200:
+            breaker.record_success()
+            return True, response.json()
+        breaker.record_failure()
+        return False, f"HTTP {response.status_code}"
     except requests.RequestException as e:
+        breaker.record_failure()
         return False, str(e)
 
+@st.cache_resource
+def load_local_backend():
+    """Load the model and its feature pipeline once per process"""
+    model, pipeline = load_bundle(MODEL_PATH)
+    if pipeline is None:
+        pipeline = FeaturePipeline.with_geo(load_geo_data())
+    return model, pipeline
+
+def check_local_backend():
+    """Health of the in-process backend, same shape as check_api_health()"""
+    if not LOCAL_BACKEND_AVAILABLE:
+        return False, "preprocessing/predict packages not found next to streamlit.py"
+    model, pipeline = load_local_backend()
+    if model is None:
+        return False, f"Model not found at {MODEL_PATH}"
+    return True, {"status": "healthy", "model_loaded": True, "geo_data_loaded": bool(pipeline.geo)}
+
+def make_local_prediction(data):
+    """Score the property in-process, without a network round trip"""
+    healthy, status = check_local_backend()
+    if not healthy:
+        return False, f"Local backend unavailable: {status}"
+    
+    model, pipeline = load_local_backend()
+    try:
+        predicted_price = predict(pipeline.transform(data), model=model)
+    except Exception as e:
+        return False, f"Local prediction error: {str(e)}"
+    
+    if predicted_price is None:
+        return False, "Failed to make prediction. Please check your input data."
+    
+    return True, {
+        "predicted_price": round(predicted_price, 2),
+        "currency": "EUR",
+        "status": "success",
+        "timestamp": datetime.now().isoformat(),
+        "inference_mode": "full"
+    }
+
+def check_backend_health():
+    """Health of whichever backend is selected"""
+    if st.session_state.backend_mode == "local":
+        return check_local_backend()
+    return check_api_health()
+
 def make_prediction(data):
+    """Make a prediction with the selected backend"""
+    if st.session_state.backend_mode == "local":
+        return make_local_prediction(data)
+    return make_remote_prediction(data)
+
+def make_remote_prediction(data):
     """Make a prediction request to the API"""
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        return False, circuit_open_message()
     try:
-        response = requests.post(
+        response = get_http_session().post(
             f"{API_BASE_URL}/predict",
             json=data,
-            headers={"Content-Type": "application/json"},
-            timeout=30
+            timeout=PREDICT_TIMEOUT
         )
         
         if response.status_code == 200:
+            breaker.record_success()
             return True, response.json()
         else:
+            if response.status_code >= 500:
+                breaker.record_failure()
             return False, f"API Error: {response.status_code} - {response.text}"
     except requests.RequestException as e:
+        breaker.record_failure()
         return False, f"Connection Error: {str(e)}"
 
-def calculate_price_insights(predicted_price, province, habitable_surface):
+def make_batch_prediction(properties):
+    """Price several properties in one call; returns (success, prices or error)"""
+    if st.session_state.backend_mode == "local":
+        return make_local_batch_prediction(properties)
+    return make_remote_batch_prediction(properties)
+
+def make_local_batch_prediction(properties):
+    """Score a list of properties in-process with one model call"""
+    healthy, status = check_local_backend()
+    if not healthy:
+        return False, f"Local backend unavailable: {status}"
+    
+    model, pipeline = load_local_backend()
+    try:
+        prices = predict_batch(pipeline.transform(pd.DataFrame(properties)), model=model)
+    except Exception as e:
+        return False, f"Local prediction error: {str(e)}"
+    
+    if prices is None:
+        return False, "Failed to make prediction. Please check your input data."
+    return True, [round(price, 2) for price in prices]
+
+def make_remote_batch_prediction(properties):
+    """Score a list of properties with one /predict/batch request"""
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        return False, circuit_open_message()
+    try:
+        response = get_http_session().post(
+            f"{API_BASE_URL}/predict/batch",
+            json={"properties": properties},
+            timeout=PREDICT_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            breaker.record_success()
+            return True, response.json()["predictions"]
+        else:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            return False, f"API Error: {response.status_code} - {response.text}"
+    except requests.RequestException as e:
+        breaker.record_failure()
+        return False, f"Connection Error: {str(e)}"
+
+def property_hash(data):
+    """Stable key for a property, used to cache its predicted price"""
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+def score_comparison_properties(properties):
+    """
+    Return one price per property (None when unavailable) and an error message
+    Only properties whose hash is not cached yet are sent, all in one batch
+    """
+    cache = st.session_state.comparison_prices
+    keys = [property_hash(data) for data in properties]
+    
+    missing = {}
+    for key, data in zip(keys, properties):
+        if key not in cache and key not in missing:
+            missing[key] = data
+    
+    error = None
+    if missing:
+        success, result = make_batch_prediction(list(missing.values()))
+        if success:
+            cache.update(zip(missing.keys(), result))
+        else:
+            error = result
+    
+    # Forget prices of properties that are no longer staged
+    for key in list(cache):
+        if key not in keys:
+            del cache[key]
+    
+    return [cache.get(key) for key in keys], error
+
+@st.cache_resource
+def load_local_market_stats():
+    """Market statistics built from the local listings file, once per process"""
+    market_stats = MarketStats(LISTINGS_PATH)
+    market_stats.load()
+    return market_stats
+
+@st.cache_data(ttl=MARKET_CACHE_TTL, show_spinner=False)
+def fetch_market_stats(backend_mode):
+    """Province market aggregates from the API (or the local listings in in-process mode)"""
+    if backend_mode == "local":
+        if not LOCAL_BACKEND_AVAILABLE or not os.path.exists(LISTINGS_PATH):
+            return None
+        return json.loads(load_local_market_stats().provinces_payload)
+    
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        return None
+    try:
+        response = get_http_session().get(f"{API_BASE_URL}/market/provinces", timeout=HEALTH_TIMEOUT)
+        if response.status_code >= 500:
+            breaker.record_failure()
+            return None
+        if 200 <= response.status_code < 300:
+            breaker.record_success()
+            return response.json()
+        return None
+    except requests.RequestException:
+        breaker.record_failure()
+        return None
+
+def get_province_market():
+    """
+    Median price and price per m² for each province, from the market statistics
+    Falls back to the reference figures for provinces without data
+    Returns (market, live) where live tells whether any statistics were found
+    """
+    payload = fetch_market_stats(st.session_state.backend_mode)
+    provinces = payload.get("provinces", {}) if payload else {}
+    
+    market = {}
+    for province, reference in PROVINCE_DATA.items():
+        stats = provinces.get(province)
+        if stats and stats.get("count"):
+            market[province] = {
+                "median_price": stats["median_price"],
+                "price_per_m2": stats["median_price_per_m2"] or reference["price_per_m2"],
+                "p25": stats["price_quantiles"]["p25"],
+                "p75": stats["price_quantiles"]["p75"],
+                "count": stats["count"],
+                "trend": reference["trend"]
+            }
+        else:
+            market[province] = {
+                "median_price": reference["avg_price"],
+                "price_per_m2": reference["price_per_m2"],
+                "p25": None,
+                "p75": None,
+                "count": None,
+                "trend": reference["trend"]
+            }
+    return market, bool(provinces)
+
+def calculate_price_insights(predicted_price, province, habitable_surface, market):
     """Calculate price insights and comparisons"""
-    if province in PROVINCE_DATA:
-        avg_price = PROVINCE_DATA[province]["avg_price"]
+    if province in market:
+        avg_price = market[province]["median_price"]
         price_per_m2 = predicted_price / habitable_surface if habitable_surface > 0 else 0
-        avg_price_per_m2 = PROVINCE_DATA[province]["price_per_m2"]
+        avg_price_per_m2 = market[province]["price_per_m2"]
         
         price_diff = predicted_price - avg_price
         price_diff_pct = (price_diff / avg_price) * 100
@@ -236,24 +636,24 @@ def calculate_price_insights(predicted_price, province, habitable_surface):
         }
     return None
 
-def create_price_comparison_chart():
+def create_price_comparison_chart(market):
     """Create a price comparison chart for provinces"""
     df = pd.DataFrame([
         {
             "Province": province,
-            "Average Price (€)": data["avg_price"],
+            "Median Price (€)": data["median_price"],
             "Price per m² (€)": data["price_per_m2"],
             "Trend": data["trend"]
         }
-        for province, data in PROVINCE_DATA.items()
+        for province, data in market.items()
     ])
     
     fig = px.bar(
         df, 
         x="Province", 
-        y="Average Price (€)",
+        y="Median Price (€)",
         color="Price per m² (€)",
-        title="Average Property Prices by Province",
+        title="Median Property Prices by Province",
         color_continuous_scale="viridis"
     )
     
@@ -305,20 +705,21 @@ def main():
     """, unsafe_allow_html=True)
     
     # Main tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["🔮 Predict Price", "📊 Market Analysis", "📈 History", "⚙️ Settings"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["🔮 Predict Price", "⚖️ Compare", "📊 Market Analysis", "📈 History", "⚙️ Settings"])
     
     with tab1:
         # API Health Check in sidebar
         with st.sidebar:
             st.markdown("### 🔧 System Status")
-            health_status, health_data = check_api_health()
+            health_status, health_data = check_backend_health()
+            backend_label = "Local model" if st.session_state.backend_mode == "local" else "API"
             
             if health_status:
-                st.success("✅ API Online")
+                st.success(f"✅ {backend_label} Online")
                 if health_data:
                     st.json(health_data)
             else:
-                st.error("❌ API Offline")
+                st.error(f"❌ {backend_label} Offline")
                 st.caption(f"Error: {health_data}")
             
             st.markdown("---")
@@ -326,6 +727,7 @@ def main():
             # Quick actions
             st.markdown("### ⚡ Quick Actions")
             if st.button("🔄 Refresh Status"):
+                check_api_health.clear()
                 st.rerun()
             
             if st.button("🗑️ Clear History"):
@@ -434,8 +836,9 @@ def main():
                 
                 # Submit button
                 submitted = st.form_submit_button("🔮 Get Price Prediction", use_container_width=True)
+                add_to_comparison = st.form_submit_button("➕ Add to Comparison", use_container_width=True)
                 
-                if submitted:
+                if submitted or add_to_comparison:
                     # Prepare data
                     prediction_data = {
                         "type": property_type,
@@ -475,6 +878,9 @@ def main():
                     if errors:
                         for error in errors:
                             st.error(f"❌ {error}")
+                    elif add_to_comparison:
+                        st.session_state.comparison_properties.append(prediction_data)
+                        st.success(f"✅ Property added to comparison ({len(st.session_state.comparison_properties)} staged)")
                     else:
                         # Make prediction
                         with st.spinner("🔄 Analyzing property..."):
@@ -482,6 +888,7 @@ def main():
                             
                             if success:
                                 predicted_price = result.get("predicted_price", 0)
+                                st.session_state.last_prediction_data = prediction_data
                                 
                                 # Store in history
                                 st.session_state.prediction_history.append({
@@ -503,7 +910,7 @@ def main():
                                 """, unsafe_allow_html=True)
                                 
                                 # Price insights
-                                insights = calculate_price_insights(predicted_price, province, habitable_surface)
+                                insights = calculate_price_insights(predicted_price, province, habitable_surface, get_province_market()[0])
                                 if insights:
                                     col_i1, col_i2, col_i3 = st.columns(3)
                                     
@@ -547,12 +954,14 @@ def main():
             
             # Province info
             if 'province' in locals():
-                province_info = PROVINCE_DATA.get(province, {})
+                province_info = get_province_market()[0].get(province, {})
+                listings_line = f"<p><strong>Listings:</strong> {province_info['count']:,}</p>" if province_info.get('count') else ""
                 st.markdown(f"""
                 <div class="info-panel">
                     <h4>{province} Market</h4>
-                    <p><strong>Average Price:</strong> €{province_info.get('avg_price', 0):,}</p>
-                    <p><strong>Price per m²:</strong> €{province_info.get('price_per_m2', 0):,}</p>
+                    <p><strong>Median Price:</strong> €{province_info.get('median_price', 0):,.0f}</p>
+                    <p><strong>Price per m²:</strong> €{province_info.get('price_per_m2', 0):,.0f}</p>
+                    {listings_line}
                     <p><strong>Trend:</strong> {province_info.get('trend', '→')}</p>
                 </div>
                 """, unsafe_allow_html=True)
@@ -569,30 +978,169 @@ def main():
                 </ul>
             </div>
             """, unsafe_allow_html=True)
+        
+        # Live what-if: sliders re-price the property without submitting the form
+        st.markdown("### 🎚️ Live What-If")
+        live_enabled = st.toggle("Update the price live as the sliders move", key="live_enabled")
+        
+        if live_enabled:
+            live_base = st.session_state.get("last_prediction_data", {
+                "type": "APARTMENT", "province": "Brussels", "postCode": "1000", "hasLivingRoom": True
+            })
+            st.caption(f"Starting from the last predicted property ({live_base.get('type', '').title()} in {live_base.get('province', '')}, {live_base.get('postCode', '')})")
+            
+            col_l1, col_l2 = st.columns([2, 1])
+            with col_l1:
+                live_features = dict(live_base)
+                live_features["habitableSurface"] = st.slider("Living Area (m²)", 20, 600, min(max(live_base.get("habitableSurface", 85), 20), 600), key="live_surface")
+                live_features["bedroomCount"] = st.slider("Bedrooms", 0, 10, min(live_base.get("bedroomCount", 2), 10), key="live_bedrooms")
+                live_features["bathroomCount"] = st.slider("Bathrooms", 0, 5, min(live_base.get("bathroomCount", 1), 5), key="live_bathrooms")
+                live_features["epcScore"] = st.select_slider(
+                    "EPC Score",
+                    options=["G", "F", "E", "D", "C", "B", "A", "A+"],
+                    value=live_base.get("epcScore", "C"),
+                    key="live_epc"
+                )
+            
+            with col_l2:
+                success, result, elapsed_ms = make_live_prediction(live_features)
+                if success:
+                    st.metric("Live Price", f"€{result:,.0f}", help="Updated on every slider change")
+                    st.caption(f"€{result / live_features['habitableSurface']:,.0f} per m²")
+                    channel = st.session_state.get("live_channel")
+                    if channel is not None and channel.latencies_ms:
+                        median_ms = sorted(channel.latencies_ms)[len(channel.latencies_ms) // 2]
+                        st.caption(f"⏱️ {elapsed_ms:.1f} ms round trip (median {median_ms:.1f} ms over {len(channel.latencies_ms)} updates)")
+                    else:
+                        st.caption(f"⏱️ {elapsed_ms:.1f} ms")
+                else:
+                    st.error(f"❌ {result}")
+        elif 'live_channel' in st.session_state:
+            st.session_state.live_channel.close()
+            del st.session_state.live_channel
     
     with tab2:
+        st.markdown("### ⚖️ Compare Properties")
+        
+        if st.session_state.comparison_properties:
+            editable_columns = ["type", "province", "postCode", "habitableSurface", "bedroomCount", "bathroomCount", "epcScore"]
+            staged_df = pd.DataFrame(st.session_state.comparison_properties)[editable_columns]
+            
+            st.caption("Edit a cell to update that property; only changed properties are re-scored.")
+            edited_df = st.data_editor(
+                staged_df,
+                key="comparison_editor",
+                use_container_width=True,
+                column_config={
+                    "type": st.column_config.SelectboxColumn("Type", options=["APARTMENT", "HOUSE"], required=True),
+                    "province": st.column_config.SelectboxColumn("Province", options=list(PROVINCE_DATA.keys()), required=True),
+                    "postCode": st.column_config.TextColumn("Postal Code", required=True),
+                    "habitableSurface": st.column_config.NumberColumn("Living Area (m²)", min_value=1, max_value=1000, step=1, required=True),
+                    "bedroomCount": st.column_config.NumberColumn("Bedrooms", min_value=0, max_value=20, step=1, required=True),
+                    "bathroomCount": st.column_config.NumberColumn("Bathrooms", min_value=0, max_value=10, step=1, required=True),
+                    "epcScore": st.column_config.SelectboxColumn("EPC", options=["A+", "A", "B", "C", "D", "E", "F", "G"], required=True),
+                }
+            )
+            
+            # Fold the edited cells back into the staged properties
+            for index, row in edited_df.iterrows():
+                for column in editable_columns:
+                    value = row[column]
+                    st.session_state.comparison_properties[index][column] = value.item() if hasattr(value, "item") else value
+            
+            properties = st.session_state.comparison_properties
+            valid = [not validate_inputs(data) for data in properties]
+            with st.spinner("🔄 Scoring properties..."):
+                prices, error = score_comparison_properties([data for data, ok in zip(properties, valid) if ok])
+            if error:
+                st.error(f"❌ {error}")
+            
+            prices = iter(prices)
+            results_df = pd.DataFrame([
+                {
+                    "Property": f"#{i + 1} {data['type'].title()} {data['postCode']}",
+                    "Province": data["province"],
+                    "Surface (m²)": data["habitableSurface"],
+                    "Predicted Price (€)": next(prices) if ok else None,
+                }
+                for i, (data, ok) in enumerate(zip(properties, valid))
+            ])
+            results_df["Predicted Price (€)"] = pd.to_numeric(results_df["Predicted Price (€)"])
+            results_df["Price per m² (€)"] = results_df["Predicted Price (€)"] / results_df["Surface (m²)"]
+            
+            if not all(valid):
+                st.warning("Some properties have invalid inputs and were not scored.")
+            
+            st.dataframe(results_df, use_container_width=True)
+            
+            scored_df = results_df.dropna(subset=["Predicted Price (€)"])
+            if not scored_df.empty:
+                fig_compare = px.bar(
+                    scored_df,
+                    x="Property",
+                    y="Predicted Price (€)",
+                    color="Price per m² (€)",
+                    title="Predicted Prices Side by Side",
+                    color_continuous_scale="viridis"
+                )
+                fig_compare.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white' if st.session_state.dark_mode else 'black'
+                )
+                st.plotly_chart(fig_compare, use_container_width=True)
+            
+            col_c1, col_c2 = st.columns(2)
+            with col_c1:
+                to_remove = st.multiselect(
+                    "Remove properties",
+                    options=list(range(len(properties))),
+                    format_func=lambda i: results_df["Property"][i]
+                )
+                if st.button("Remove Selected") and to_remove:
+                    st.session_state.comparison_properties = [
+                        data for i, data in enumerate(properties) if i not in to_remove
+                    ]
+                    st.session_state.pop("comparison_editor", None)
+                    st.rerun()
+            with col_c2:
+                if st.button("🗑️ Clear Comparison"):
+                    st.session_state.comparison_properties = []
+                    st.session_state.comparison_prices = {}
+                    st.session_state.pop("comparison_editor", None)
+                    st.rerun()
+        else:
+            st.info("No properties staged yet. Use '➕ Add to Comparison' in the 'Predict Price' tab.")
+    
+    with tab3:
         st.markdown("### 📊 Market Analysis")
         
+        market, market_live = get_province_market()
+        if not market_live:
+            st.caption("Market statistics unavailable, showing reference figures.")
+        
         # Price comparison chart
-        fig = create_price_comparison_chart()
+        fig = create_price_comparison_chart(market)
         st.plotly_chart(fig, use_container_width=True)
         
         # Province comparison table
         st.markdown("### 🏘️ Province Comparison")
         
         comparison_data = []
-        for province, data in PROVINCE_DATA.items():
+        for province, data in market.items():
             comparison_data.append({
                 "Province": province,
-                "Avg Price (€)": f"€{data['avg_price']:,}",
-                "Price/m² (€)": f"€{data['price_per_m2']:,}",
+                "Median Price (€)": f"€{data['median_price']:,.0f}",
+                "Price/m² (€)": f"€{data['price_per_m2']:,.0f}",
+                "P25–P75 (€)": f"€{data['p25']:,.0f} – €{data['p75']:,.0f}" if data['p25'] is not None else "–",
+                "Listings": f"{data['count']:,}" if data['count'] else "–",
                 "Market Trend": data['trend']
             })
         
         df_comparison = pd.DataFrame(comparison_data)
         st.dataframe(df_comparison, use_container_width=True)
     
-    with tab3:
+    with tab4:
         st.markdown("### 📈 Prediction History")
         
         if st.session_state.prediction_history:
@@ -619,7 +1167,7 @@ def main():
         else:
             st.info("No predictions yet. Make your first prediction in the 'Predict Price' tab!")
     
-    with tab4:
+    with tab5:
         st.markdown("### ⚙️ Settings")
         
         col1, col2 = st.columns(2)
@@ -631,6 +1179,13 @@ def main():
                 st.rerun()
             
             st.markdown("**🔧 API Configuration**")
+            st.radio(
+                "Prediction backend",
+                list(BACKEND_MODES.keys()),
+                format_func=BACKEND_MODES.get,
+                key="backend_mode",
+                help="In-process mode skips the network and needs the model next to this app"
+            )
             st.code(f"API Endpoint: {API_BASE_URL}")
             
         with col2: